@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.metrics import instrument_engine
 
 # 1. Get the database URL from environment variables
 # If not set, default to a localhost connection (useful for local testing without Docker)
@@ -10,8 +11,18 @@ DATABASE_URL = os.getenv(
 )
 
 # 2. Create the SQLAlchemy engine
-# pool_pre_ping=True helps handle DB connection drops gracefully
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# pool_pre_ping=True helps handle DB connection drops gracefully.
+# Every gunicorn worker has its own pool, so the server can open up to
+# WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+)
+
+# Record per-statement timings for the /metrics endpoint
+instrument_engine(engine)
 
 # 3. Create a SessionLocal class
 # Each instance of this class will be a database session
@@ -29,4 +40,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
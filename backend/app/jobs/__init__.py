@@ -0,0 +1,3 @@
+from app.jobs.runner import JobRunner, JobContext, JobClaimError
+from app.jobs.registry import JOBS, job
+from app.jobs.scheduler import NightlyScheduler
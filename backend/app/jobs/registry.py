@@ -0,0 +1,178 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from app.jobs.runner import JobContext
+
+DEFAULT_PLACE = "Plzeň, Czechia"
+
+
+@dataclass(frozen=True)
+class JobDefinition:
+    name: str
+    func: Callable[[JobContext], dict]
+    description: str
+    # Fills in defaults that depend on the submit time (e.g. "yesterday"), so
+    # a retry or resume after midnight still works on the same input
+    prepare: Callable[[dict], dict] = None
+
+
+JOBS = {}
+
+
+def job(name: str, description: str, prepare: Callable[[dict], dict] = None):
+    """Registers a job function under 'name'."""
+    def decorator(func):
+        JOBS[name] = JobDefinition(name=name, func=func, description=description, prepare=prepare)
+        return func
+    return decorator
+
+
+def prepare_params(name: str, params: dict = None) -> dict:
+    """Returns the parameters to store with a new job of type 'name'."""
+    params = dict(params or {})
+    definition = JOBS[name]
+    return definition.prepare(params) if definition.prepare else params
+
+
+def _parse_date(value, default: date) -> date:
+    if value is None:
+        return default
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _yesterday() -> date:
+    return date.today() - timedelta(days=1)
+
+
+def _default_date(params: dict) -> dict:
+    if params.get("date") is None and params.get("start_date") is None:
+        params["date"] = _yesterday().isoformat()
+    return params
+
+
+def _edges_chunk_key(osm_ids) -> str:
+    """
+    Names a chunk of edges by its content rather than its position. If OSM
+    changed between attempts, chunks that differ from what was written get
+    new keys and are imported again instead of being skipped.
+    """
+    osm_ids = list(osm_ids)
+    digest = hashlib.sha1("\n".join(osm_ids).encode()).hexdigest()[:12]
+    return f"edges:{osm_ids[0]}..{osm_ids[-1]}:{digest}"
+
+
+@job(
+    "daily_stats",
+    "Per-segment width statistics. Params: date | start_date, end_date (default: yesterday).",
+    prepare=_default_date,
+)
+def daily_stats(ctx: JobContext):
+    from app.services.analytics_service import AnalyticsService
+    from app.services.trend_service import TrendService
+
+    start = _parse_date(ctx.params.get("start_date", ctx.params.get("date")), _yesterday())
+    end = _parse_date(ctx.params.get("end_date"), start)
+    if end < start:
+        raise ValueError(f"end_date {end} is before start_date {start}")
+
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    ctx.set_total(len(days))
+
+    service = AnalyticsService(ctx.db, stage_timer=ctx.stage)
+    trend_service = TrendService(ctx.db)
+    for day in days:
+        key = day.isoformat()
+        if ctx.is_done(key):
+            continue
+        with ctx.chunk(key):
+            service.calculate_daily_stats(day)
+            # Fold the new day into the rolling baselines while it is fresh
+            with ctx.stage("trends"):
+                trend_service.update_for_date(day)
+
+    return {"start_date": start.isoformat(), "end_date": end.isoformat(), "days": len(days)}
+
+
+@job("trends", "Rebuild width baselines and changes from stored statistics. Params: start_date, end_date, rebuild.")
+def trends(ctx: JobContext):
+    from sqlalchemy import func, select
+
+    from app.models import SegmentStatistics
+    from app.services.trend_service import TrendService
+
+    service = TrendService(ctx.db)
+    first, last = ctx.db.execute(
+        select(func.min(SegmentStatistics.stat_date), func.max(SegmentStatistics.stat_date))
+    ).one()
+    if first is None:
+        return {"days": 0}
+
+    start = _parse_date(ctx.params.get("start_date"), first)
+    end = _parse_date(ctx.params.get("end_date"), last)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    rebuild = str(ctx.params.get("rebuild", "")).lower() in ("1", "true", "yes")
+    ctx.set_total(len(days) + (1 if rebuild else 0))
+
+    # A rebuild starts from empty baselines; the reset is its own chunk so a
+    # resumed rebuild does not wipe the days it already replayed
+    if rebuild and not ctx.is_done("reset"):
+        with ctx.chunk("reset"):
+            service.reset()
+
+    for day in days:
+        key = day.isoformat()
+        if ctx.is_done(key):
+            continue
+        with ctx.chunk(key), ctx.stage("trends"):
+            service.update_for_date(day)
+
+    return {"start_date": start.isoformat(), "end_date": end.isoformat(), "days": len(days)}
+
+
+@job(
+    "obstacles",
+    "DBSCAN obstacle detection, stored for the API. Params: date (default: yesterday).",
+    prepare=_default_date,
+)
+def obstacles(ctx: JobContext):
+    from app.services.ml_service import MLService
+
+    target_date = _parse_date(ctx.params.get("date"), _yesterday())
+    ctx.set_total(1)
+
+    with ctx.chunk(target_date.isoformat()), ctx.stage("detect"):
+        found = MLService(ctx.db).store_obstacles(target_date)
+
+    return {"date": target_date.isoformat(), "obstacles": found}
+
+
+@job("osm_import", "Road segment import from OpenStreetMap. Params: place, chunk_size.")
+def osm_import(ctx: JobContext):
+    from app.services.osm_service import OSMService
+
+    place = ctx.params.get("place", DEFAULT_PLACE)
+    chunk_size = int(ctx.params.get("chunk_size", 1000))
+
+    service = OSMService(ctx.db)
+    with ctx.stage("fetch"):
+        gdf_edges = service.fetch_edges(place)
+
+    offsets = range(0, len(gdf_edges), chunk_size)
+    ctx.set_total(len(offsets))
+
+    # Each attempt downloads the edges again; fetch_edges sorts them by OSM id
+    # and chunks are keyed by content, so a resume lines up with what was written
+    imported = 0
+    for offset in offsets:
+        batch = gdf_edges.iloc[offset:offset + chunk_size]
+        key = _edges_chunk_key(batch["osm_id"])
+        if ctx.is_done(key):
+            continue
+        with ctx.chunk(key), ctx.stage("write"):
+            imported += service.store_edges(batch)
+
+    return {"place": place, "edges": len(gdf_edges), "imported_this_attempt": imported}
@@ -0,0 +1,376 @@
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.metrics import JOB_DURATION
+from app.models import Job, JobCheckpoint
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# A running job touches its 'updated_at' this often (seconds), independent of
+# chunk progress, so long chunks and stages are not mistaken for a crash
+HEARTBEAT_INTERVAL = 60.0
+
+# A 'running' job without a heartbeat for this long is assumed to have crashed
+STALE_AFTER = timedelta(seconds=HEARTBEAT_INTERVAL * 5)
+
+# Failed jobs are retried automatically up to this many attempts in total,
+# waiting RETRY_BACKOFF * 2^(attempts - 1) after each failure
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BACKOFF = timedelta(minutes=int(os.getenv("JOB_RETRY_BACKOFF_MINUTES", "5")))
+
+
+class JobClaimError(Exception):
+    """The job is held by another runner (or already finished) and cannot be started."""
+
+
+def serialize_job(job: Job):
+    return {
+        "id": str(job.id),
+        "name": job.name,
+        "params": job.params,
+        "status": job.status,
+        "trigger": job.trigger,
+        "attempts": job.attempts,
+        "chunks_total": job.chunks_total,
+        "chunks_done": job.chunks_done,
+        "stage_timings": job.stage_timings,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+class JobContext:
+    """
+    Handed to every job function. Exposes the job parameters, a work session
+    ('db'), per-stage timers and chunk-level checkpoints.
+
+    Bookkeeping goes through a separate session so that a rollback of the work
+    session never loses progress that was already recorded.
+    """
+
+    def __init__(self, job: Job, state_db, work_db):
+        self.job = job
+        self.params = dict(job.params or {})
+        self.db = work_db
+        self._state_db = state_db
+        self._timings = dict(job.stage_timings or {})
+        self._done = set(
+            state_db.scalars(
+                select(JobCheckpoint.chunk_key).where(JobCheckpoint.job_id == job.id)
+            ).all()
+        )
+
+    def set_total(self, total: int):
+        self.job.chunks_total = total
+        self.job.chunks_done = len(self._done)
+        self._state_db.commit()
+
+    def is_done(self, chunk_key: str) -> bool:
+        return chunk_key in self._done
+
+    @contextmanager
+    def stage(self, name: str):
+        """Adds the wall-clock time spent inside the block to 'stage_timings[name]'."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._timings[name] = round(self._timings.get(name, 0.0) + elapsed, 3)
+            # Assign a new dict so SQLAlchemy notices the JSONB change
+            self.job.stage_timings = dict(self._timings)
+
+    @contextmanager
+    def chunk(self, chunk_key: str):
+        """
+        Runs one unit of work. The checkpoint is committed only after the block
+        finishes, so work interrupted mid-chunk is redone on resume. Chunks must
+        therefore be idempotent.
+        """
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+
+        self._state_db.add(
+            JobCheckpoint(
+                job_id=self.job.id, chunk_key=chunk_key, duration_seconds=round(elapsed, 3)
+            )
+        )
+        self._done.add(chunk_key)
+        self.job.chunks_done = len(self._done)
+        self._state_db.commit()
+
+        if self.job.chunks_total:
+            logger.info(
+                "Job %s (%s): chunk %s done (%d/%d) in %.2fs",
+                self.job.name, self.job.id, chunk_key,
+                self.job.chunks_done, self.job.chunks_total, elapsed,
+            )
+
+
+class JobRunner:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def submit(self, name: str, params: dict = None, trigger: str = "cli", dedupe_key: str = None):
+        """
+        Records a new pending job and returns it serialized. If 'dedupe_key' is
+        given and a job with that key already exists, the existing job is returned.
+        """
+        from app.jobs.registry import JOBS, prepare_params
+
+        if name not in JOBS:
+            raise ValueError(f"Unknown job: {name}")
+        params = prepare_params(name, params)
+
+        db = self.session_factory()
+        try:
+            if dedupe_key:
+                existing = db.scalar(select(Job).where(Job.dedupe_key == dedupe_key))
+                if existing:
+                    return serialize_job(existing)
+
+            job = Job(
+                name=name,
+                params=params,
+                trigger=trigger,
+                dedupe_key=dedupe_key,
+                status=PENDING,
+            )
+            db.add(job)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Lost a race with another submitter using the same dedupe_key
+                db.rollback()
+                return serialize_job(
+                    db.scalar(select(Job).where(Job.dedupe_key == dedupe_key))
+                )
+            db.refresh(job)
+            return serialize_job(job)
+        finally:
+            db.close()
+
+    def start(self, name: str, params: dict = None, trigger: str = "cli"):
+        """
+        Records a job that is already claimed by the caller and runs it in this
+        process, so no other runner can pick it up in between.
+        """
+        from app.jobs.registry import JOBS, prepare_params
+
+        if name not in JOBS:
+            raise ValueError(f"Unknown job: {name}")
+        params = prepare_params(name, params)
+
+        db = self.session_factory()
+        try:
+            job = Job(
+                name=name,
+                params=params,
+                trigger=trigger,
+                status=RUNNING,
+                attempts=1,
+                started_at=datetime.now(timezone.utc),
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        return self._execute(job_id)
+
+    def run(self, job_id):
+        """
+        Claims and executes (or resumes) a job. Chunks checkpointed by earlier
+        attempts are skipped. Raises JobClaimError if another runner is on it;
+        failures of the job itself are recorded on the job rather than raised.
+        """
+        job = self.get(job_id)
+        if job is None:
+            raise ValueError(f"Job not found: {job_id}")
+        if job["status"] == SUCCEEDED:
+            return job
+
+        claimed = self._claim(
+            Job.id == uuid.UUID(str(job_id)),
+            or_(Job.status.in_([PENDING, FAILED]), self._stale()),
+        )
+        if claimed is None:
+            raise JobClaimError(f"Job {job_id} is already {self.get(job_id)['status']}")
+        return self._execute(claimed)
+
+    def run_next(self):
+        """
+        Claims and executes the oldest job that is pending, failed with a retry
+        due, or stale. Returns the finished job, or None when there was nothing
+        to do. Safe to call from several processes at once.
+        """
+        retry_due = and_(
+            Job.status == FAILED,
+            Job.attempts < MAX_ATTEMPTS,
+            Job.finished_at <= func.now() - func.make_interval(
+                0, 0, 0, 0, 0, 0,
+                RETRY_BACKOFF.total_seconds() * func.power(2, Job.attempts - 1),
+            ),
+        )
+        candidate = (
+            select(Job.id)
+            .where(or_(Job.status == PENDING, retry_due, self._stale()))
+            .order_by(Job.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        claimed = self._claim(Job.id == candidate)
+        return self._execute(claimed) if claimed is not None else None
+
+    def requeue(self, job_id):
+        """
+        Puts a failed or stale job back to 'pending' so the scheduler resumes it.
+        Raises JobClaimError if the job is running or already succeeded.
+        """
+        db = self.session_factory()
+        try:
+            requeued = db.scalar(
+                update(Job)
+                .where(Job.id == uuid.UUID(str(job_id)), or_(Job.status == FAILED, self._stale()))
+                .values(status=PENDING, updated_at=func.now())
+                .returning(Job.id)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        job = self.get(job_id)
+        if job is None:
+            raise ValueError(f"Job not found: {job_id}")
+        if requeued is None and job["status"] != PENDING:
+            raise JobClaimError(f"Job {job_id} is already {job['status']}")
+        return job
+
+    @staticmethod
+    def _stale():
+        return and_(Job.status == RUNNING, Job.updated_at < func.now() - STALE_AFTER)
+
+    def _claim(self, *conditions):
+        """
+        Marks the job matching 'conditions' as running in a single UPDATE, so
+        two runners can never both claim it. Returns its id, or None.
+        """
+        db = self.session_factory()
+        try:
+            claimed = db.scalar(
+                update(Job)
+                .where(*conditions)
+                .values(
+                    status=RUNNING,
+                    attempts=Job.attempts + 1,
+                    error=None,
+                    started_at=func.now(),
+                    finished_at=None,
+                    updated_at=func.now(),
+                )
+                .returning(Job.id)
+            )
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _execute(self, job_id):
+        from app.jobs.registry import JOBS
+
+        state_db = self.session_factory()
+        work_db = self.session_factory()
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, stop_heartbeat), name="job-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        try:
+            job = state_db.get(Job, job_id)
+
+            logger.info("Starting job %s (%s), attempt %d", job.name, job.id, job.attempts)
+
+            ctx = JobContext(job, state_db, work_db)
+            started = time.perf_counter()
+            try:
+                result = JOBS[job.name].func(ctx)
+            except Exception as e:
+                work_db.rollback()
+                state_db.rollback()
+                logger.exception("Job %s (%s) failed", job.name, job.id)
+                job.status = FAILED
+                job.error = "".join(traceback.format_exception(e))
+                job.stage_timings = dict(ctx._timings)
+            else:
+                job.status = SUCCEEDED
+                job.result = result
+                job.stage_timings = dict(ctx._timings)
+                logger.info("Job %s (%s) succeeded", job.name, job.id)
+
+            JOB_DURATION.labels(job=job.name, status=job.status).observe(
+                time.perf_counter() - started
+            )
+            job.finished_at = datetime.now(timezone.utc)
+            state_db.commit()
+            return serialize_job(job)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            work_db.close()
+            state_db.close()
+
+    def _heartbeat(self, job_id, stop: threading.Event):
+        """Keeps a running job from looking stale while it makes no chunk progress."""
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == RUNNING)
+                    .values(updated_at=func.now())
+                )
+                db.commit()
+            except Exception:
+                logger.exception("Heartbeat of job %s failed", job_id)
+            finally:
+                db.close()
+
+    def get(self, job_id):
+        db = self.session_factory()
+        try:
+            job = db.get(Job, uuid.UUID(str(job_id)))
+            return serialize_job(job) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(self, limit: int = 50):
+        db = self.session_factory()
+        try:
+            jobs = db.scalars(
+                select(Job).order_by(Job.created_at.desc()).limit(limit)
+            ).all()
+            return [serialize_job(job) for job in jobs]
+        finally:
+            db.close()
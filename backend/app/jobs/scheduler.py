@@ -0,0 +1,61 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from app.jobs.runner import JobRunner
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated list of jobs run every night for the previous day
+NIGHTLY_JOBS = [
+    name.strip()
+    for name in os.getenv("NIGHTLY_JOBS", "daily_stats,obstacles").split(",")
+    if name.strip()
+]
+
+# Local time ("HH:MM") after which the nightly jobs become due
+NIGHTLY_RUN_AT = os.getenv("NIGHTLY_RUN_AT", "02:00")
+
+
+class NightlyScheduler:
+    def __init__(self, runner: JobRunner = None, jobs=None, run_at: str = NIGHTLY_RUN_AT):
+        self.runner = runner or JobRunner()
+        self.jobs = jobs or NIGHTLY_JOBS
+        self.run_at = datetime.strptime(run_at, "%H:%M").time()
+
+    def run_due(self, now: datetime = None):
+        """
+        Submits every nightly job for the previous day once 'run_at' has passed.
+        Jobs are keyed by name and date, so calling this repeatedly is safe.
+        """
+        now = now or datetime.now()
+        if now.time() < self.run_at:
+            return
+
+        target_date = (now.date() - timedelta(days=1)).isoformat()
+        for name in self.jobs:
+            self.runner.submit(
+                name,
+                {"date": target_date},
+                trigger="scheduler",
+                dedupe_key=f"{name}:{target_date}",
+            )
+
+    def run_pending(self):
+        """
+        Runs queued jobs until none is left: new ones (nightly or submitted via
+        the API), failed ones whose retry backoff has passed and crashed ones.
+        """
+        while self.runner.run_next() is not None:
+            pass
+
+    def run_forever(self, poll_seconds: int = 60):
+        logger.info("Scheduler started: %s daily at %s", ", ".join(self.jobs), self.run_at)
+        while True:
+            try:
+                self.run_due()
+                self.run_pending()
+            except Exception:
+                logger.exception("Scheduler tick failed")
+            time.sleep(poll_seconds)
@@ -1,14 +1,22 @@
 from app.models import RoadSegment, SegmentStatistics
 from sqlalchemy import select, func, cast, String
 from app.database import get_db
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Body, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from datetime import date
+from uuid import UUID
 import json
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
 from app.services.analytics_service import AnalyticsService
 from app.services.dashboard_service import DashboardService
 from app.services.ml_service import MLService
+from app.services.trend_service import TrendService
+from app.services.routing_service import RoutingGraphUnavailable, RoutingService
+from typing import Literal, Optional
+from app.jobs import JOBS, JobClaimError, JobRunner
+from app.metrics import MULTIPROCESS, REQUEST_LATENCY, start_request_timing
 
 # Initialize the FastAPI application with metadata
 app = FastAPI(
@@ -35,6 +43,46 @@ app.add_middleware(
 )
 # --------------------------------------------------------------------------
 
+# --------------------------------------------------------------------------
+# METRICS
+# --------------------------------------------------------------------------
+# Every request is timed per route template (not raw path, to keep label
+# cardinality bounded). Total and DB time are also returned in the
+# Server-Timing header so they show up in the browser's network tab.
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    db_time = start_request_timing()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.labels(
+            method=request.method, endpoint=endpoint, status=str(status)
+        ).observe(elapsed)
+
+    response.headers["Server-Timing"] = (
+        f"app;dur={elapsed * 1000:.1f}, db;dur={db_time[0] * 1000:.1f}"
+    )
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint. Under gunicorn (PROMETHEUS_MULTIPROC_DIR set)
+    the metrics of all workers are aggregated.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+# --------------------------------------------------------------------------
+
 @app.get("/")
 async def root():
     """
@@ -184,11 +232,12 @@ async def get_obstacles(
     db: Session = Depends(get_db)
 ):
     """
-    Detects physical obstacles using DBSCAN clustering on narrow measurements.
+    Physical obstacles found by DBSCAN clustering of narrow measurements, as
+    stored by the nightly 'obstacles' job (detected live for unprocessed days).
     Returns GeoJSON FeatureCollection of obstacle centroids.
     """
     ml_service = MLService(db)
-    obstacles = ml_service.detect_obstacles(target_date)
+    obstacles = ml_service.get_obstacles(target_date)
 
     features = []
     for obs in obstacles:
@@ -207,4 +256,92 @@ async def get_obstacles(
     return {
         "type": "FeatureCollection",
         "features": features
-    }
\ No newline at end of file
+    }
+
+@app.get("/api/analytics/changes")
+async def get_width_changes(
+    target_date: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    severity: Optional[Literal["warning", "critical"]] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Returns segments whose average width dropped significantly below their
+    rolling baseline on 'target_date' (default: latest day with changes).
+    GeoJSON FeatureCollection ranked by z-score, strongest drop first.
+    """
+    service = TrendService(db)
+    return service.get_changes(target_date, limit=limit, severity=severity)
+
+@app.get("/api/routing/passable")
+def check_passable_route(
+    from_lat: float = Query(..., ge=-90, le=90, allow_inf_nan=False),
+    from_lon: float = Query(..., ge=-180, le=180, allow_inf_nan=False),
+    to_lat: float = Query(..., ge=-90, le=90, allow_inf_nan=False),
+    to_lon: float = Query(..., ge=-180, le=180, allow_inf_nan=False),
+    vehicle_width: float = Query(..., gt=0, allow_inf_nan=False),
+    width_metric: Literal["min", "avg"] = "min",
+    allow_unmeasured: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Can a vehicle of 'vehicle_width' (cm) get from A to B? Returns the shortest
+    route over segments wide enough, or the too-narrow segments blocking the
+    shortest unrestricted route. Unmeasured segments count as passable unless
+    'allow_unmeasured' is false.
+    """
+    # Plain 'def' (threadpool) because the graph search is CPU-bound and
+    # must not block the event loop for other requests
+    service = RoutingService(db)
+    try:
+        return service.check_passability(
+            from_lat, from_lon, to_lat, to_lon,
+            vehicle_width=vehicle_width,
+            width_metric=width_metric,
+            allow_unmeasured=allow_unmeasured,
+        )
+    except RoutingGraphUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 50):
+    """
+    Returns the most recent background jobs with their progress and stage timings.
+    """
+    return JobRunner().list_jobs(limit)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: UUID):
+    """
+    Returns a single job including checkpoint progress, result and error.
+    """
+    job = JobRunner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_name}", status_code=202)
+async def trigger_job(job_name: str, params: dict = Body(default={})):
+    """
+    Queues a job (e.g. 'daily_stats', 'obstacles', 'osm_import'). The scheduler
+    process picks it up; poll '/api/jobs/{job_id}' for progress.
+    """
+    if job_name not in JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_name}")
+
+    return JobRunner().submit(job_name, params, trigger="api")
+
+@app.post("/api/jobs/{job_id}/resume", status_code=202)
+async def resume_job(job_id: UUID):
+    """
+    Queues a failed or interrupted job to resume from its last checkpoint.
+    Returns 409 if the job is still running or already succeeded.
+    """
+    try:
+        return JobRunner().requeue(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except JobClaimError as e:
+        raise HTTPException(status_code=409, detail=str(e))
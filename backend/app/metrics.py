@@ -0,0 +1,195 @@
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+# prometheus_client switches to multiprocess mode as soon as the variable
+# exists, even if empty (the docker-compose development override), so drop
+# an empty one before the first metric is created
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR") == "":
+    del os.environ["PROMETHEUS_MULTIPROC_DIR"]
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess, start_http_server
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Gunicorn workers write metrics to files in this directory
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Queries slower than this (seconds) are logged and counted
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", "0.5"))
+
+# How many distinct slow statements keep their own label (per process)
+SLOW_QUERY_TOP_N = int(os.getenv("SLOW_QUERY_TOP_N", "20"))
+
+REQUEST_LATENCY = Histogram(
+    "clearway_http_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    ["method", "endpoint", "status"],
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "clearway_db_query_duration_seconds",
+    "SQL statement execution time by operation",
+    ["operation"],
+)
+
+DB_SLOW_QUERY_MAX = Gauge(
+    "clearway_db_slow_query_max_seconds",
+    "Slowest observed execution time of the slowest statements",
+    ["statement"],
+    # Only live workers count, so the labels of recycled workers go away
+    # (gunicorn.conf.py marks them dead) and cardinality stays bounded
+    multiprocess_mode="livemax",
+)
+
+DB_SLOW_QUERY_COUNT = Counter(
+    "clearway_db_slow_queries_total",
+    "Number of statements slower than SLOW_QUERY_THRESHOLD",
+    ["operation"],
+)
+
+STAGE_LATENCY = Histogram(
+    "clearway_pipeline_stage_duration_seconds",
+    "Time spent in a stage of an analytics pipeline",
+    ["pipeline", "stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+DBSCAN_LATENCY = Histogram(
+    "clearway_dbscan_duration_seconds",
+    "DBSCAN clustering time in obstacle detection",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+DBSCAN_POINTS = Histogram(
+    "clearway_dbscan_input_points",
+    "Number of points clustered per obstacle detection run",
+    buckets=(10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+
+OBSTACLES_DETECTED = Histogram(
+    "clearway_obstacles_detected",
+    "Number of obstacle clusters found per detection run",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250),
+)
+
+JOB_DURATION = Histogram(
+    "clearway_job_duration_seconds",
+    "Wall-clock time of a job attempt",
+    ["job", "status"],
+    buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200),
+)
+
+ROUTING_QUERY_LATENCY = Histogram(
+    "clearway_routing_query_duration_seconds",
+    "Graph search time of a passability query",
+    ["outcome"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+ROUTING_GRAPH_RELOADS = Counter(
+    "clearway_routing_graph_reloads_total",
+    "Routing graph reloads by kind (full rebuild or incremental width update)",
+    ["kind"],
+)
+
+# Per-request accumulated DB time, used for the Server-Timing response header
+_request_db_time = ContextVar("request_db_time", default=None)
+
+_slowest = {}
+_slowest_lock = Lock()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@contextmanager
+def time_stage(pipeline: str, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(pipeline=pipeline, stage=stage).observe(time.perf_counter() - started)
+
+
+def start_metrics_server(port: int):
+    """
+    Serves /metrics of a process that has no API, such as the job scheduler,
+    on 'port' from a background thread.
+    """
+    registry = None
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info("Serving metrics on port %d", port)
+
+
+def start_request_timing():
+    """Starts accumulating DB time for the current request; returns the holder."""
+    holder = [0.0]
+    _request_db_time.set(holder)
+    return holder
+
+
+def _fingerprint(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:200]
+
+
+def _record_slow_query(statement: str, elapsed: float, operation: str):
+    DB_SLOW_QUERY_COUNT.labels(operation=operation).inc()
+    fingerprint = _fingerprint(statement)
+    logger.warning("Slow %s statement (%.3fs): %s", operation, elapsed, fingerprint)
+
+    with _slowest_lock:
+        if elapsed <= _slowest.get(fingerprint, 0.0):
+            return
+
+        if MULTIPROCESS:
+            # Labels cannot be removed in multiprocess mode, so each worker
+            # labels only the first N distinct statements it sees; a worker
+            # recycled by max_requests starts a new selection
+            if fingerprint not in _slowest and len(_slowest) >= SLOW_QUERY_TOP_N:
+                return
+            _slowest[fingerprint] = elapsed
+        else:
+            _slowest[fingerprint] = elapsed
+
+            # Keep label cardinality bounded: only the N slowest statements stay exported
+            if len(_slowest) > SLOW_QUERY_TOP_N:
+                evicted = min(_slowest, key=_slowest.get)
+                del _slowest[evicted]
+                if evicted == fingerprint:
+                    return
+                DB_SLOW_QUERY_MAX.remove(evicted)
+
+        DB_SLOW_QUERY_MAX.labels(statement=fingerprint).set(elapsed)
+
+
+def instrument_engine(engine):
+    """Attaches SQL timing hooks to a SQLAlchemy engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        words = statement.split(None, 1)
+        operation = words[0].upper() if words else "UNKNOWN"
+
+        DB_QUERY_LATENCY.labels(operation=operation).observe(elapsed)
+
+        holder = _request_db_time.get()
+        if holder is not None:
+            holder[0] += elapsed
+
+        if elapsed >= SLOW_QUERY_THRESHOLD:
+            _record_slow_query(statement, elapsed, operation)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, func, Date, ForeignKey, Float, Integer, BigInteger
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, func, Date, ForeignKey, Float, Integer, BigInteger, Text, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.database import Base
 from geoalchemy2 import Geometry
 import uuid
@@ -37,6 +37,12 @@ class CleanedMeasurement(Base):
 
 class SegmentStatistics(Base):
     __tablename__ = "segment_statistics"
+    # The table comes from clearway-infra; these indexes are added by app/schema.py
+    __table_args__ = (
+        Index("ix_segment_statistics_stat_date", "stat_date", postgresql_concurrently=True),
+        # Incremental routing graph refresh reads rows past a (created_at, id) watermark
+        Index("ix_segment_statistics_created_at_id", "created_at", "id", postgresql_concurrently=True),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -51,4 +57,113 @@ class SegmentStatistics(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    segment = relationship("RoadSegment")    
\ No newline at end of file
+    segment = relationship("RoadSegment")
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    name = Column(String(50), nullable=False, index=True)
+
+    # Optional idempotency key (e.g. "daily_stats:2025-12-23") used by the scheduler
+    # so the same nightly run is never submitted twice.
+    dedupe_key = Column(String(255), unique=True, nullable=True)
+
+    params = Column(JSONB, nullable=False, default=dict)
+
+    # pending -> running -> succeeded | failed
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    trigger = Column(String(20), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    chunks_total = Column(Integer, nullable=True)
+    chunks_done = Column(Integer, nullable=False, default=0)
+
+    # Accumulated wall-clock seconds per stage, e.g. {"load": 1.2, "join": 8.4}
+    stage_timings = Column(JSONB, nullable=False, default=dict)
+
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    __table_args__ = (UniqueConstraint("job_id", "chunk_key"),)
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    chunk_key = Column(String(255), nullable=False)
+
+    duration_seconds = Column(Float)
+
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Rolling (exponentially weighted) baseline of a segment's average width,
+# updated incrementally as each day's statistics arrive.
+class SegmentBaseline(Base):
+    __tablename__ = "segment_baselines"
+
+    segment_id = Column(UUID(as_uuid=True), ForeignKey("road_segments.id"), primary_key=True)
+
+    # Last stat_date folded into the baseline; older dates are never re-applied
+    last_stat_date = Column(Date, nullable=False)
+
+    ewma_mean = Column(Float, nullable=False)
+    ewma_var = Column(Float, nullable=False, default=0.0)
+    observations = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# A statistically significant width drop detected for a segment on a given day.
+class SegmentChange(Base):
+    __tablename__ = "segment_changes"
+    __table_args__ = (UniqueConstraint("segment_id", "stat_date"),)
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+
+    segment_id = Column(UUID(as_uuid=True), ForeignKey("road_segments.id"), nullable=False)
+
+    stat_date = Column(Date, nullable=False, index=True)
+
+    observed_width = Column(Float, nullable=False)
+    baseline_width = Column(Float, nullable=False)
+    baseline_std = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+    severity = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    segment = relationship("RoadSegment")
+
+# Marks a day for which obstacle detection has run, so a day without any
+# obstacles is distinguishable from one that was never processed.
+class ObstacleDetection(Base):
+    __tablename__ = "obstacle_detections"
+
+    detection_date = Column(Date, primary_key=True)
+
+    obstacle_count = Column(Integer, nullable=False, default=0)
+
+    detected_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# An obstacle (DBSCAN cluster centroid of narrow measurements) found on a given day.
+class Obstacle(Base):
+    __tablename__ = "obstacles"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+
+    detection_date = Column(
+        Date, ForeignKey("obstacle_detections.detection_date", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    severity = Column(String(20), nullable=False)
+    cluster_size = Column(Integer, nullable=False)
@@ -0,0 +1,56 @@
+"""
+Tables and indexes owned by the analytics backend. The core schema
+(road_segments, cleaned_measurements, segment_statistics) comes from
+clearway-infra and is only extended here.
+
+Run once per deploy with 'python run_job.py init-db' (the scheduler also
+runs it on start). The API never changes the schema.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import Base, engine
+from app.models import (
+    Job, JobCheckpoint, SegmentBaseline, SegmentChange, ObstacleDetection, Obstacle, SegmentStatistics
+)
+
+logger = logging.getLogger(__name__)
+
+OWNED_TABLES = [Job, JobCheckpoint, SegmentBaseline, SegmentChange, ObstacleDetection, Obstacle]
+
+# Infra-owned tables that need extra indexes for the queries of this backend
+INDEXED_TABLES = [SegmentStatistics]
+
+# Serializes concurrent init_schema() calls (arbitrary, app-wide constant)
+_LOCK_KEY = 72_410_001
+
+
+def init_schema():
+    """
+    Creates missing tables and indexes; safe to run repeatedly. Indexes on
+    infra tables are built CONCURRENTLY so writers are not blocked, which
+    needs autocommit. A build that failed half-way leaves an invalid index
+    behind; it is dropped and rebuilt.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _LOCK_KEY})
+        try:
+            Base.metadata.create_all(bind=conn, tables=[model.__table__ for model in OWNED_TABLES])
+
+            for model in INDEXED_TABLES:
+                for index in model.__table__.indexes:
+                    invalid = conn.scalar(
+                        text(
+                            "SELECT NOT indisvalid FROM pg_index "
+                            "WHERE indexrelid = to_regclass(:name)"
+                        ),
+                        {"name": index.name},
+                    )
+                    if invalid:
+                        logger.warning("Rebuilding invalid index %s", index.name)
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
@@ -1,33 +1,61 @@
 from sqlalchemy.orm import Session
 from datetime import date
-import geopandas as gpd
-from sqlalchemy import text, select, cast, func
+from contextlib import nullcontext, contextmanager
+from sqlalchemy import text, select, cast, func, delete
 from app.models import SegmentStatistics, RoadSegment, CleanedMeasurement
 from geoalchemy2 import Geography
+from app.metrics import time_stage
+
+
+def _no_stage_timer(name: str):
+    return nullcontext()
 
 
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, stage_timer=None):
+        """
+        'stage_timer' is an optional callable taking a stage name and returning a
+        context manager; the job runner uses it to record per-stage timings.
+        """
         self.db = db
+        self.stage_timer = stage_timer or _no_stage_timer
+
+    @contextmanager
+    def _stage(self, name: str):
+        with time_stage("daily_stats", name), self.stage_timer(name):
+            yield
 
     def calculate_daily_stats(self, target_date: date):
+        """
+        Computes per-segment width statistics for 'target_date'.
+        Re-running for the same date replaces the previous rows, so the
+        calculation is safe to resume after a crash.
+        """
+        # GeoPandas is only needed by this batch calculation; importing it lazily
+        # keeps it off the API serving path
+        import geopandas as gpd
+
         print(f"Calculating statistics for date: {target_date}")
 
-        print("Loading road segments from database...")
-        sql_roads = "SELECT id, osm_id, geom FROM road_segments"
-        gdf_roads = gpd.read_postgis(sql_roads, self.db.connection(), geom_col="geom")
-        gdf_roads.set_crs(epsg=4326, allow_override=True, inplace=True)
-
-        print("Loading measurements from database...")
-        sql_measurements = text(f"""
-            SELECT id, cleaned_width, geom
-            FROM cleaned_measurements
-            WHERE DATE(created_at) = '{target_date}'
-        """)
-        gdf_measurements = gpd.read_postgis(
-            sql_measurements, self.db.connection(), geom_col="geom"
-        )
-        gdf_measurements.set_crs(epsg=4326, allow_override=True, inplace=True)
+        with self._stage("load"):
+            print("Loading road segments from database...")
+            sql_roads = "SELECT id, osm_id, geom FROM road_segments"
+            gdf_roads = gpd.read_postgis(sql_roads, self.db.connection(), geom_col="geom")
+            gdf_roads.set_crs(epsg=4326, allow_override=True, inplace=True)
+
+            print("Loading measurements from database...")
+            sql_measurements = text("""
+                SELECT id, cleaned_width, geom
+                FROM cleaned_measurements
+                WHERE DATE(created_at) = :target_date
+            """)
+            gdf_measurements = gpd.read_postgis(
+                sql_measurements,
+                self.db.connection(),
+                geom_col="geom",
+                params={"target_date": target_date},
+            )
+            gdf_measurements.set_crs(epsg=4326, allow_override=True, inplace=True)
 
         if gdf_measurements.empty:
             print("No measurements found for the given date.")
@@ -37,46 +65,55 @@ class AnalyticsService:
             f"Found {len(gdf_measurements)} measurements and {len(gdf_roads)} road segments. Performing spatial join with road segments..."
         )
 
-        gdf_measurements = gdf_measurements.to_crs(epsg=3857)
-        gdf_roads = gdf_roads.to_crs(epsg=3857)
+        with self._stage("reproject"):
+            gdf_measurements = gdf_measurements.to_crs(epsg=3857)
+            gdf_roads = gdf_roads.to_crs(epsg=3857)
 
         print("Performing spatial join...")
 
-        matched = gpd.sjoin_nearest(
-            gdf_measurements,
-            gdf_roads,
-            how="inner",
-            distance_col="dist",
-            max_distance=10,
-        )
+        with self._stage("join"):
+            matched = gpd.sjoin_nearest(
+                gdf_measurements,
+                gdf_roads,
+                how="inner",
+                distance_col="dist",
+                max_distance=10,
+            )
 
         print(f"Spatial join completed. Found {len(matched)} matched measurements.")
 
-        stats = (
-            matched.groupby("id_right")["cleaned_width"]
-            .agg(
-                avg_width="mean",
-                min_width="min",
-                max_width="max",
-                measurements_count="count",
+        with self._stage("aggregate"):
+            stats = (
+                matched.groupby("id_right")["cleaned_width"]
+                .agg(
+                    avg_width="mean",
+                    min_width="min",
+                    max_width="max",
+                    measurements_count="count",
+                )
+                .reset_index()
             )
-            .reset_index()
-        )
 
         print(f"Storing statistics for {len(stats)} road segments in the database...")
 
-        for _, row in stats.iterrows():
-            stat_record = SegmentStatistics(
-                segment_id=row["id_right"],
-                stat_date=target_date,
-                avg_width=round(row["avg_width"], 2),
-                min_width=round(row["min_width"], 2),
-                max_width=round(row["max_width"], 2),
-                measurements_count=int(row["measurements_count"]),
+        with self._stage("write"):
+            # Replace any rows left behind by an earlier (possibly interrupted) run
+            self.db.execute(
+                delete(SegmentStatistics).where(SegmentStatistics.stat_date == target_date)
             )
-            self.db.add(stat_record)
 
-        self.db.commit()
+            for _, row in stats.iterrows():
+                stat_record = SegmentStatistics(
+                    segment_id=row["id_right"],
+                    stat_date=target_date,
+                    avg_width=round(row["avg_width"], 2),
+                    min_width=round(row["min_width"], 2),
+                    max_width=round(row["max_width"], 2),
+                    measurements_count=int(row["measurements_count"]),
+                )
+                self.db.add(stat_record)
+
+            self.db.commit()
         print("Statistics calculation and storage completed.")
 
     def get_segment_histogram(self, segment_id: str):
@@ -1,19 +1,60 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import CleanedMeasurement
+from sqlalchemy import func, select, delete
+from app.models import CleanedMeasurement, ObstacleDetection, Obstacle
 from datetime import date
-from sklearn.cluster import DBSCAN
 import numpy as np
+import time
+from app.metrics import DBSCAN_LATENCY, DBSCAN_POINTS, OBSTACLES_DETECTED
 
 class MLService:
     def __init__(self, db: Session):
         self.db = db
 
+    def get_obstacles(self, target_date: date):
+        """
+        Returns the obstacles stored by the nightly 'obstacles' job for
+        'target_date'. Days that were not processed yet (e.g. today, while
+        measurements are still arriving) are detected on the fly.
+        """
+        detected = self.db.scalar(
+            select(ObstacleDetection.detection_date).where(ObstacleDetection.detection_date == target_date)
+        )
+        if detected is None:
+            return self.detect_obstacles(target_date)
+
+        rows = self.db.execute(
+            select(Obstacle.lat, Obstacle.lon, Obstacle.severity, Obstacle.cluster_size)
+            .where(Obstacle.detection_date == target_date)
+            .order_by(Obstacle.cluster_size.desc())
+        ).all()
+        return [row._asdict() for row in rows]
+
+    def store_obstacles(self, target_date: date):
+        """
+        Runs detection for 'target_date' and replaces the day's stored
+        obstacles. Returns the number of obstacles found.
+        """
+        obstacles = self.detect_obstacles(target_date)
+
+        self.db.execute(delete(ObstacleDetection).where(ObstacleDetection.detection_date == target_date))
+        self.db.add(ObstacleDetection(detection_date=target_date, obstacle_count=len(obstacles)))
+        self.db.flush()
+        if obstacles:
+            self.db.execute(
+                Obstacle.__table__.insert(),
+                [{"detection_date": target_date, **obs} for obs in obstacles],
+            )
+        self.db.commit()
+        return len(obstacles)
+
     def detect_obstacles(self, target_date: date):
         """
         Detects clusters of narrow width measurements using DBSCAN algorithm.
         Returns a list of obstacle centroids.
         """
+        # scikit-learn takes about a second to import; load it on first use only
+        from sklearn.cluster import DBSCAN
+
         # 1. Fetch data: Points with width < 300cm for the given date
         # We need to filter by date. Since CleanedMeasurement has 'created_at' (DateTime),
         # we cast it to Date.
@@ -43,7 +84,10 @@ class MLService:
         MIN_SAMPLES = 5
 
         dbscan = DBSCAN(eps=EPSILON, min_samples=MIN_SAMPLES, metric='haversine', algorithm='ball_tree')
+        started = time.perf_counter()
         dbscan.fit(coords_rad)
+        DBSCAN_LATENCY.observe(time.perf_counter() - started)
+        DBSCAN_POINTS.observe(len(coords))
 
         # 5. Process clusters
         labels = dbscan.labels_
@@ -64,10 +108,11 @@ class MLService:
             cluster_size = len(cluster_points)
 
             obstacles.append({
-                "lat": centroid[0],
-                "lon": centroid[1],
+                "lat": float(centroid[0]),
+                "lon": float(centroid[1]),
                 "severity": "critical", # All < 300cm are considered critical here
                 "cluster_size": int(cluster_size)
             })
 
+        OBSTACLES_DETECTED.observe(len(obstacles))
         return obstacles
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-import osmnx as ox
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 from app.models import RoadSegment
 from geoalchemy2.shape import from_shape
 
@@ -7,8 +8,13 @@ class OSMService:
     def __init__(self, db: Session):
         self.db = db
 
-    def import_segments_for_place(self, place_name: str = "Plzeň, Czechia"):
-        print(f"Importing road segments for place: {place_name}")
+    def fetch_edges(self, place_name: str):
+        """
+        Downloads the drivable road graph for 'place_name' and returns its edges
+        as a GeoDataFrame with 'u', 'v', 'key' and 'osm_id' columns, sorted by
+        'osm_id' so that repeated downloads come in the same order.
+        """
+        import osmnx as ox
 
         G = ox.graph_from_place(place_name, network_type='drive')
 
@@ -17,32 +23,59 @@ class OSMService:
         print(f"Number of edges fetched: {len(gdf_edges)}")
 
         gdf_edges = gdf_edges.reset_index()
+        gdf_edges["osm_id"] = [
+            f"{u}-{v}-{key}" for u, v, key in zip(gdf_edges["u"], gdf_edges["v"], gdf_edges["key"])
+        ]
+        return gdf_edges.sort_values("osm_id", kind="stable").reset_index(drop=True)
 
-        count = 0
+    def store_edges(self, gdf_edges):
+        """
+        Upserts a batch of edges into 'road_segments' keyed by OSM id and commits.
+        Storing the same batch twice leaves the table unchanged.
+        """
+        rows = []
         for _, row in gdf_edges.iterrows():
             name = row.get('name')
             if isinstance(name, list):
-                name = name[0] 
+                name = name[0]
 
             road_type = row.get('highway')
             if isinstance(road_type, list):
                 road_type = road_type[0]
 
-            osm_id_str = f"{row['u']}-{row['v']}-{row['key']}"
-
-            segment = RoadSegment(
-                osm_id=osm_id_str,
-                name=str(name) if name else "Unknown",
-                road_type=str(road_type),
-                geom=from_shape(row['geometry'], srid=4326)
-            )
-
-            self.db.merge(segment)
-            count += 1
-        
-            if count % 1000 == 0:
-                self.db.commit()
-                print(f"Committed {count} segments so far.")
-    
+            rows.append({
+                "osm_id": row['osm_id'],
+                "name": str(name) if name else "Unknown",
+                "road_type": str(road_type),
+                "geom": from_shape(row['geometry'], srid=4326),
+            })
+
+        if not rows:
+            return 0
+
+        stmt = insert(RoadSegment).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RoadSegment.osm_id],
+            set_={
+                "name": stmt.excluded.name,
+                "road_type": stmt.excluded.road_type,
+                "geom": stmt.excluded.geom,
+                "updated_at": func.now(),
+            },
+        )
+        self.db.execute(stmt)
         self.db.commit()
-        print(f"Finished importing. Total segments imported: {count}")
\ No newline at end of file
+
+        return len(rows)
+
+    def import_segments_for_place(self, place_name: str = "Plzeň, Czechia", chunk_size: int = 1000):
+        print(f"Importing road segments for place: {place_name}")
+
+        gdf_edges = self.fetch_edges(place_name)
+
+        count = 0
+        for offset in range(0, len(gdf_edges), chunk_size):
+            count += self.store_edges(gdf_edges.iloc[offset:offset + chunk_size])
+            print(f"Committed {count} segments so far.")
+
+        print(f"Finished importing. Total segments imported: {count}")
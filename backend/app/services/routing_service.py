@@ -0,0 +1,461 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, cast, tuple_
+from geoalchemy2 import Geography
+from app.database import SessionLocal
+from app.models import RoadSegment, SegmentStatistics
+from app.metrics import ROUTING_QUERY_LATENCY, ROUTING_GRAPH_RELOADS
+from array import array
+from datetime import datetime
+from threading import Lock, Thread
+import heapq
+import json
+import logging
+import math
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a worker checks the database for new statistics
+REFRESH_INTERVAL = 30.0
+
+# Incremental refreshes read rows past a (created_at, id) watermark. created_at
+# is the transaction start, so a transaction committing after a later one can
+# fall behind the watermark; a periodic full resync (seconds) picks those up.
+FULL_RESYNC_INTERVAL = 3600.0
+
+# Segment endpoints closer than this (degrees, ~0.1 m) are the same intersection
+NODE_PRECISION = 6
+
+# Start/end points farther than this (m) from any intersection are rejected
+MAX_SNAP_DISTANCE = 500.0
+
+EARTH_RADIUS_METERS = 6371000.0
+
+
+class RoutingGraphUnavailable(Exception):
+    """The road graph has no segments yet, so no query can be answered."""
+
+
+class RoadGraph:
+    """
+    Compact in-memory road graph for width-constrained routing.
+
+    Nodes are segment endpoints; every road segment is an undirected edge
+    (emergency vehicles may use one-way streets). Adjacency is stored in CSR
+    form in typed arrays: the arcs of node 'n' are indices[indptr[n]:indptr[n+1]]
+    and arc_edge maps each arc back to its segment. Widths are per segment,
+    taken from its latest SegmentStatistics row (NaN when never measured), and
+    are the only part updated in place.
+    """
+
+    def __init__(self, segment_ids, starts, ends, lengths):
+        edge_count = len(segment_ids)
+        self.segment_ids = segment_ids
+        self.edge_index = {segment_id: i for i, segment_id in enumerate(segment_ids)}
+
+        endpoints = np.round(np.concatenate([starts, ends]), NODE_PRECISION)
+        if edge_count:
+            nodes, inverse = np.unique(endpoints, axis=0, return_inverse=True)
+        else:
+            nodes, inverse = np.empty((0, 2)), np.empty(0, dtype=np.int64)
+        inverse = inverse.reshape(-1)
+        start, end = inverse[:edge_count], inverse[edge_count:]
+
+        # Both directions of every edge, grouped by source node
+        sources = np.concatenate([start, end])
+        targets = np.concatenate([end, start])
+        edges = np.concatenate([np.arange(edge_count), np.arange(edge_count)])
+        order = np.argsort(sources, kind="stable")
+
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(nodes)), out=indptr[1:])
+
+        self.node_lon = nodes[:, 0].copy()
+        self.node_lat = nodes[:, 1].copy()
+        # Radians as typed arrays for the A* heuristic (numpy scalar access is slow)
+        self.node_lon_rad = array("d", np.radians(self.node_lon).tobytes())
+        self.node_lat_rad = array("d", np.radians(self.node_lat).tobytes())
+        self.indptr = array("q", indptr.tobytes())
+        self.indices = array("i", targets[order].astype(np.int32).tobytes())
+        self.arc_edge = array("i", edges[order].astype(np.int32).tobytes())
+        self.length = array("d", np.asarray(lengths, dtype=np.float64).tobytes())
+
+        self.min_width = array("d", [math.nan]) * edge_count
+        self.avg_width = array("d", [math.nan]) * edge_count
+        self.stat_day = array("i", [0]) * edge_count
+
+    @property
+    def node_count(self):
+        return len(self.node_lon)
+
+    def set_statistics(self, segment_id, stat_date, min_width, avg_width):
+        """
+        Stores a segment's statistics unless newer ones are already known.
+        Returns True only if a width actually changed.
+        """
+        edge = self.edge_index.get(segment_id)
+        if edge is None or stat_date.toordinal() < self.stat_day[edge]:
+            return False
+        min_width = math.nan if min_width is None else min_width
+        avg_width = math.nan if avg_width is None else avg_width
+        changed = not (_same_width(self.min_width[edge], min_width) and _same_width(self.avg_width[edge], avg_width))
+
+        self.stat_day[edge] = stat_date.toordinal()
+        self.min_width[edge] = min_width
+        self.avg_width[edge] = avg_width
+        return changed
+
+    def widths(self, width_metric: str):
+        return self.min_width if width_metric == "min" else self.avg_width
+
+    def nearest_node(self, lat: float, lon: float):
+        """Returns (node, distance in meters) of the intersection closest to the point."""
+        dx = np.radians(self.node_lon - lon) * math.cos(math.radians(lat))
+        dy = np.radians(self.node_lat - lat)
+        distances = np.hypot(dx, dy) * EARTH_RADIUS_METERS
+        node = int(np.argmin(distances))
+        return node, float(distances[node])
+
+    def shortest_path(self, source: int, target: int, vehicle_width: float = None,
+                      width_metric: str = "min", allow_unmeasured: bool = True):
+        """
+        A* search over the CSR adjacency. Segments narrower than 'vehicle_width'
+        are skipped (no width limit when it is None). Returns (length in meters,
+        list of edge indices) or None when the target is unreachable.
+        """
+        widths = self.widths(width_metric)
+        indptr, indices, arc_edge, length = self.indptr, self.indices, self.arc_edge, self.length
+
+        # Equirectangular distance to the target; scaled down slightly so it never
+        # overestimates the geodesic segment lengths
+        node_lon, node_lat = self.node_lon_rad, self.node_lat_rad
+        target_lon, target_lat = node_lon[target], node_lat[target]
+        lon_scale = math.cos(target_lat) * EARTH_RADIUS_METERS * 0.99
+        lat_scale = EARTH_RADIUS_METERS * 0.99
+        hypot = math.hypot
+
+        def heuristic(node):
+            return hypot((node_lon[node] - target_lon) * lon_scale, (node_lat[node] - target_lat) * lat_scale)
+
+        best = {source: 0.0}
+        came_from = {}
+        # Entries are (f, -g, node): on equal f the deeper node wins, which avoids
+        # exploring every equally short detour on grid-like street networks
+        heap = [(heuristic(source), -0.0, source)]
+        while heap:
+            _, neg_distance, node = heapq.heappop(heap)
+            distance = -neg_distance
+            if node == target:
+                path = []
+                while node != source:
+                    node, edge = came_from[node]
+                    path.append(edge)
+                path.reverse()
+                return distance, path
+            if distance > best.get(node, math.inf):
+                continue
+
+            for arc in range(indptr[node], indptr[node + 1]):
+                edge = arc_edge[arc]
+                if vehicle_width is not None:
+                    # Inlined _is_blocked(); this loop dominates query time
+                    width = widths[edge]
+                    if width != width:
+                        if not allow_unmeasured:
+                            continue
+                    elif width < vehicle_width:
+                        continue
+
+                neighbour = indices[arc]
+                candidate = distance + length[edge]
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    came_from[neighbour] = (node, edge)
+                    heapq.heappush(heap, (candidate + heuristic(neighbour), -candidate, neighbour))
+
+        return None
+
+
+def _same_width(a: float, b: float):
+    return a == b or (a != a and b != b)
+
+
+def _is_blocked(width: float, vehicle_width: float, allow_unmeasured: bool):
+    if width != width:  # NaN: never measured
+        return not allow_unmeasured
+    return width < vehicle_width
+
+
+def find_route(graph: RoadGraph, source: int, target: int, vehicle_width: float,
+               width_metric: str = "min", allow_unmeasured: bool = True):
+    """
+    Returns (outcome, distance in meters, edges). 'passable' comes with the
+    route; 'blocked' with the segments of the unrestricted shortest route that
+    are too narrow (distance None); 'no_route' when the nodes are disconnected.
+    """
+    found = graph.shortest_path(source, target, vehicle_width, width_metric, allow_unmeasured)
+    if found is not None:
+        distance, path = found
+        return "passable", distance, path
+
+    unrestricted = graph.shortest_path(source, target)
+    if unrestricted is None:
+        return "no_route", None, []
+
+    widths = graph.widths(width_metric)
+    blocking = [
+        edge for edge in unrestricted[1]
+        if _is_blocked(widths[edge], vehicle_width, allow_unmeasured)
+    ]
+    return "blocked", None, blocking
+
+
+class PassabilityGraph:
+    """
+    Holds the current RoadGraph of a worker and keeps it fresh: a changed road
+    network triggers a rebuild that is swapped in atomically, new statistics
+    are applied in place. Only the first build happens inside a request; later
+    refreshes run in a background thread while requests keep using the graph
+    they have.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = Lock()
+        self._last_check = 0.0
+        self._last_full_sync = 0.0
+        self._topology_version = None
+        self._stats_watermark = None
+        self.graph = None
+
+    def current(self, db: Session) -> RoadGraph:
+        """Returns the graph, building it on first use and refreshing it at most every REFRESH_INTERVAL."""
+        graph = self.graph
+        if graph is None:
+            with self._lock:
+                if self.graph is None:
+                    self._refresh(db)
+                    self._last_check = time.monotonic()
+                return self.graph
+
+        if time.monotonic() - self._last_check >= REFRESH_INTERVAL and self._lock.acquire(blocking=False):
+            if time.monotonic() - self._last_check >= REFRESH_INTERVAL:
+                Thread(target=self._refresh_in_background, name="routing-graph-refresh", daemon=True).start()
+            else:
+                self._lock.release()
+        return graph
+
+    def _refresh_in_background(self):
+        # Runs with self._lock held by the thread that started it
+        db = self.session_factory()
+        try:
+            self._refresh(db)
+        except Exception:
+            logger.exception("Routing graph refresh failed; keeping the current graph")
+        finally:
+            db.close()
+            self._last_check = time.monotonic()
+            self._lock.release()
+
+    def _refresh(self, db: Session):
+        topology_version = tuple(db.execute(
+            select(
+                func.count(RoadSegment.id),
+                func.max(func.coalesce(RoadSegment.updated_at, RoadSegment.created_at)),
+            )
+        ).one())
+
+        if self.graph is None or topology_version != self._topology_version:
+            graph = self._build(db)
+            self._apply_statistics(db, graph, full=True)
+            self.graph = graph
+            self._topology_version = topology_version
+            ROUTING_GRAPH_RELOADS.labels(kind="full").inc()
+            logger.info("Routing graph ready: %d nodes, %d segments", graph.node_count, len(graph.segment_ids))
+        elif time.monotonic() - self._last_full_sync >= FULL_RESYNC_INTERVAL:
+            self._apply_statistics(db, self.graph, full=True)
+            ROUTING_GRAPH_RELOADS.labels(kind="resync").inc()
+        else:
+            self._apply_statistics(db, self.graph)
+
+    def _build(self, db: Session) -> RoadGraph:
+        logger.info("Building routing graph from road segments")
+
+        rows = db.execute(
+            select(
+                RoadSegment.id,
+                func.ST_X(func.ST_StartPoint(RoadSegment.geom)),
+                func.ST_Y(func.ST_StartPoint(RoadSegment.geom)),
+                func.ST_X(func.ST_EndPoint(RoadSegment.geom)),
+                func.ST_Y(func.ST_EndPoint(RoadSegment.geom)),
+                func.ST_Length(cast(RoadSegment.geom, Geography)),
+            )
+        ).all()
+
+        coords = np.array([row[1:5] for row in rows], dtype=np.float64).reshape(-1, 4)
+        return RoadGraph(
+            segment_ids=[row[0] for row in rows],
+            starts=coords[:, 0:2],
+            ends=coords[:, 2:4],
+            lengths=[row[5] or 0.0 for row in rows],
+        )
+
+    def _apply_statistics(self, db: Session, graph: RoadGraph, full: bool = False):
+        """
+        Applies statistics rows past the (created_at, id) watermark, or the
+        latest row per segment when 'full'. Each row is read once, through the
+        (created_at, id) index, so work is proportional to the new rows only.
+        """
+        if full:
+            # The full read resets the watermark to the newest row in the table
+            last = db.execute(
+                select(SegmentStatistics.created_at, SegmentStatistics.id)
+                .where(SegmentStatistics.created_at.is_not(None))
+                .order_by(SegmentStatistics.created_at.desc(), SegmentStatistics.id.desc())
+                .limit(1)
+            ).first()
+            query = select(
+                SegmentStatistics.segment_id,
+                SegmentStatistics.stat_date,
+                SegmentStatistics.min_width,
+                SegmentStatistics.avg_width,
+            ).distinct(SegmentStatistics.segment_id).order_by(
+                SegmentStatistics.segment_id,
+                SegmentStatistics.stat_date.desc(),
+                SegmentStatistics.created_at.desc(),
+            )
+            updated = sum(graph.set_statistics(*row) for row in db.execute(query))
+            self._stats_watermark = tuple(last) if last is not None else None
+            self._last_full_sync = time.monotonic()
+            if updated and graph is self.graph:
+                logger.info("Routing graph: resync changed widths of %d segments", updated)
+            return
+
+        query = select(
+            SegmentStatistics.segment_id,
+            SegmentStatistics.stat_date,
+            SegmentStatistics.min_width,
+            SegmentStatistics.avg_width,
+            SegmentStatistics.created_at,
+            SegmentStatistics.id,
+        ).where(
+            SegmentStatistics.created_at.is_not(None)
+        ).order_by(SegmentStatistics.created_at, SegmentStatistics.id)
+        if self._stats_watermark is not None:
+            query = query.where(
+                tuple_(SegmentStatistics.created_at, SegmentStatistics.id) > tuple_(*self._stats_watermark)
+            )
+
+        updated = 0
+        watermark = self._stats_watermark
+        for segment_id, stat_date, min_width, avg_width, created_at, row_id in db.execute(query):
+            if graph.set_statistics(segment_id, stat_date, min_width, avg_width):
+                updated += 1
+            watermark = (created_at, row_id)
+
+        self._stats_watermark = watermark
+        if updated:
+            ROUTING_GRAPH_RELOADS.labels(kind="incremental").inc()
+            logger.info("Routing graph: changed widths of %d segments", updated)
+
+
+_passability_graph = PassabilityGraph()
+
+
+def get_passability_graph():
+    """Process-wide graph holder shared by all requests of a worker."""
+    return _passability_graph
+
+
+class RoutingService:
+    def __init__(self, db: Session, passability_graph: PassabilityGraph = None):
+        self.db = db
+        self.passability_graph = passability_graph or get_passability_graph()
+
+    def check_passability(self, from_lat: float, from_lon: float, to_lat: float, to_lon: float,
+                          vehicle_width: float, width_metric: str = "min",
+                          allow_unmeasured: bool = True):
+        """
+        Answers whether a vehicle of 'vehicle_width' (cm, like the stored widths)
+        can get from A to B. Returns the route when it can; otherwise the
+        segments on the unrestricted shortest route that are too narrow.
+        """
+        if not all(math.isfinite(value) for value in (from_lat, from_lon, to_lat, to_lon)):
+            raise ValueError("Coordinates must be finite numbers.")
+        if not math.isfinite(vehicle_width) or vehicle_width <= 0:
+            raise ValueError("vehicle_width must be a positive number.")
+
+        graph = self.passability_graph.current(self.db)
+
+        if not graph.segment_ids:
+            raise RoutingGraphUnavailable("Routing graph is empty; import road segments first.")
+
+        source, source_snap = graph.nearest_node(from_lat, from_lon)
+        target, target_snap = graph.nearest_node(to_lat, to_lon)
+        # Written so that a NaN distance is rejected too
+        if not (source_snap <= MAX_SNAP_DISTANCE and target_snap <= MAX_SNAP_DISTANCE):
+            raise ValueError(
+                f"Start or destination is more than {MAX_SNAP_DISTANCE:.0f} m from the road network."
+            )
+
+        started = time.perf_counter()
+        outcome, distance, edges = find_route(
+            graph, source, target, vehicle_width, width_metric, allow_unmeasured
+        )
+        ROUTING_QUERY_LATENCY.labels(outcome=outcome).observe(time.perf_counter() - started)
+
+        response = {
+            "passable": outcome == "passable",
+            "outcome": outcome,
+            "vehicle_width": vehicle_width,
+            "width_metric": width_metric,
+            "snap_distance_m": {"from": round(source_snap, 1), "to": round(target_snap, 1)},
+        }
+        if outcome == "passable":
+            response["distance_m"] = round(distance, 1)
+            response["route"] = self._segments_geojson(graph, edges)
+        else:
+            response["blocking"] = self._segments_geojson(graph, edges)
+        return response
+
+    def _segments_geojson(self, graph: RoadGraph, edges):
+        """GeoJSON FeatureCollection of the given graph edges, in order."""
+        segment_ids = [graph.segment_ids[edge] for edge in edges]
+        if not segment_ids:
+            return {"type": "FeatureCollection", "features": []}
+
+        rows = self.db.query(
+            RoadSegment.id,
+            RoadSegment.name,
+            func.ST_AsGeoJSON(RoadSegment.geom).label("geometry")
+        ).filter(
+            RoadSegment.id.in_(segment_ids)
+        ).all()
+        by_id = {row.id: row for row in rows}
+
+        features = []
+        for edge, segment_id in zip(edges, segment_ids):
+            row = by_id.get(segment_id)
+            if row is None:
+                continue
+            features.append({
+                "type": "Feature",
+                "geometry": json.loads(row.geometry),
+                "properties": {
+                    "segment_id": str(segment_id),
+                    "name": row.name or "Unknown Road",
+                    "min_width": _none_if_nan(graph.min_width[edge]),
+                    "avg_width": _none_if_nan(graph.avg_width[edge]),
+                    "stat_date": (
+                        datetime.fromordinal(graph.stat_day[edge]).date().isoformat()
+                        if graph.stat_day[edge] else None
+                    ),
+                }
+            })
+
+        return {"type": "FeatureCollection", "features": features}
+
+
+def _none_if_nan(value: float):
+    return None if value != value else value
@@ -0,0 +1,226 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, delete
+from sqlalchemy.dialects.postgresql import insert
+from app.models import RoadSegment, SegmentStatistics, SegmentBaseline, SegmentChange
+from datetime import date
+import json
+import math
+
+# Weight of the newest day in the exponentially weighted baseline (~ last 10 days)
+EWMA_ALPHA = 0.2
+
+# A day must be this many standard deviations below the baseline to be flagged
+Z_THRESHOLD = 3.0
+
+# Observations needed before a baseline is trusted
+MIN_OBSERVATIONS = 5
+
+# Floor for the standard deviation (cm), so very stable segments don't flag tiny dips
+MIN_STD = 10.0
+
+# Ignore drops smaller than this (cm) even if statistically significant
+MIN_DROP = 30.0
+
+# Widths are in cm; below this the road is considered impassable (see DashboardService)
+CRITICAL_WIDTH = 300.0
+
+
+def score_observation(baseline, observed: float):
+    """
+    Compares one day's average width with the segment's baseline and returns
+    (z_score, severity), or None when the day is not a significant drop.
+    """
+    if baseline is None or baseline.observations < MIN_OBSERVATIONS:
+        return None
+
+    std = max(math.sqrt(baseline.ewma_var), MIN_STD)
+    drop = baseline.ewma_mean - observed
+    z_score = -drop / std
+
+    if z_score > -Z_THRESHOLD or drop < MIN_DROP:
+        return None
+
+    severity = "critical" if observed < CRITICAL_WIDTH or z_score <= -2 * Z_THRESHOLD else "warning"
+    return z_score, severity
+
+
+def update_baseline(baseline, observed: float):
+    """
+    Folds one observation into the EWMA mean/variance and returns the new
+    (mean, var, observations). Incremental form, so no history is needed.
+    """
+    if baseline is None:
+        return observed, 0.0, 1
+
+    diff = observed - baseline.ewma_mean
+    increment = EWMA_ALPHA * diff
+    mean = baseline.ewma_mean + increment
+    var = (1 - EWMA_ALPHA) * (baseline.ewma_var + diff * increment)
+    return mean, var, baseline.observations + 1
+
+
+def plan_updates(rows, stat_date: date):
+    """
+    Turns the day's rows (segment_id, avg_width and the segment's baseline
+    columns, None without a baseline) into (baselines, changes) rows to
+    upsert. Only the first row of each segment is used.
+    """
+    baselines = []
+    changes = []
+    seen = set()
+    for row in rows:
+        segment_id, observed = row.segment_id, row.avg_width
+        if segment_id in seen:
+            continue
+        seen.add(segment_id)
+
+        baseline = row if row.last_stat_date is not None else None
+        if baseline is not None and baseline.last_stat_date >= stat_date:
+            continue
+
+        scored = score_observation(baseline, observed)
+        if scored is not None:
+            z_score, severity = scored
+            changes.append({
+                "segment_id": segment_id,
+                "stat_date": stat_date,
+                "observed_width": observed,
+                "baseline_width": round(baseline.ewma_mean, 2),
+                "baseline_std": round(max(math.sqrt(baseline.ewma_var), MIN_STD), 2),
+                "z_score": round(z_score, 2),
+                "severity": severity,
+            })
+
+        mean, var, observations = update_baseline(baseline, observed)
+        baselines.append({
+            "segment_id": segment_id,
+            "last_stat_date": stat_date,
+            "ewma_mean": mean,
+            "ewma_var": var,
+            "observations": observations,
+        })
+
+    return baselines, changes
+
+
+class TrendService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def update_for_date(self, stat_date: date):
+        """
+        Scores the statistics of 'stat_date' against each segment's baseline,
+        stores significant drops and advances the baselines. Work is linear in
+        the number of segments measured that day. Days at or before a segment's
+        'last_stat_date' are skipped, so the update is safe to repeat, but it
+        must be run in date order.
+        """
+        print(f"Updating width trends for date: {stat_date}")
+
+        # segment_statistics has no unique (segment_id, stat_date), so read only
+        # the latest row of each segment; an upsert cannot touch a row twice
+        rows = self.db.execute(
+            select(
+                SegmentStatistics.segment_id,
+                SegmentStatistics.avg_width,
+                SegmentBaseline.last_stat_date,
+                SegmentBaseline.ewma_mean,
+                SegmentBaseline.ewma_var,
+                SegmentBaseline.observations,
+            )
+            .outerjoin(SegmentBaseline, SegmentBaseline.segment_id == SegmentStatistics.segment_id)
+            .where(
+                SegmentStatistics.stat_date == stat_date,
+                SegmentStatistics.avg_width.is_not(None),
+            )
+            .distinct(SegmentStatistics.segment_id)
+            .order_by(SegmentStatistics.segment_id, SegmentStatistics.created_at.desc())
+        ).all()
+
+        baselines, changes = plan_updates(rows, stat_date)
+
+        if baselines:
+            stmt = insert(SegmentBaseline)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SegmentBaseline.segment_id],
+                set_={
+                    "last_stat_date": stmt.excluded.last_stat_date,
+                    "ewma_mean": stmt.excluded.ewma_mean,
+                    "ewma_var": stmt.excluded.ewma_var,
+                    "observations": stmt.excluded.observations,
+                    "updated_at": func.now(),
+                },
+                # Never move a baseline backwards if two updates race
+                where=SegmentBaseline.last_stat_date < stmt.excluded.last_stat_date,
+            )
+            self.db.execute(stmt, baselines)
+
+        if changes:
+            stmt = insert(SegmentChange).on_conflict_do_nothing(
+                index_elements=[SegmentChange.segment_id, SegmentChange.stat_date]
+            )
+            self.db.execute(stmt, changes)
+
+        self.db.commit()
+        print(f"Updated {len(baselines)} baselines, flagged {len(changes)} width drops.")
+
+        return {"baselines_updated": len(baselines), "changes_flagged": len(changes)}
+
+    def reset(self):
+        """Drops all baselines and detected changes, e.g. before a full rebuild."""
+        self.db.execute(delete(SegmentChange))
+        self.db.execute(delete(SegmentBaseline))
+        self.db.commit()
+
+    def get_changes(self, target_date: date = None, limit: int = 50, severity: str = None):
+        """
+        Returns a GeoJSON FeatureCollection of width drops for 'target_date'
+        (default: the latest day with any), ranked by z-score, strongest first.
+        """
+        if target_date is None:
+            target_date = self.db.scalar(select(func.max(SegmentChange.stat_date)))
+            if target_date is None:
+                return {"type": "FeatureCollection", "stat_date": None, "features": []}
+
+        query = self.db.query(
+            SegmentChange.segment_id,
+            RoadSegment.name,
+            SegmentChange.observed_width,
+            SegmentChange.baseline_width,
+            SegmentChange.baseline_std,
+            SegmentChange.z_score,
+            SegmentChange.severity,
+            func.ST_AsGeoJSON(RoadSegment.geom).label("geometry")
+        ).join(
+            RoadSegment, RoadSegment.id == SegmentChange.segment_id
+        ).filter(
+            SegmentChange.stat_date == target_date
+        )
+        if severity:
+            query = query.filter(SegmentChange.severity == severity)
+
+        results = query.order_by(SegmentChange.z_score.asc()).limit(limit).all()
+
+        features = []
+        for rank, row in enumerate(results, start=1):
+            features.append({
+                "type": "Feature",
+                "geometry": json.loads(row.geometry),
+                "properties": {
+                    "rank": rank,
+                    "segment_id": str(row.segment_id),
+                    "name": row.name or "Unknown Road",
+                    "observed_width": row.observed_width,
+                    "baseline_width": row.baseline_width,
+                    "baseline_std": row.baseline_std,
+                    "drop": round(row.baseline_width - row.observed_width, 2),
+                    "z_score": row.z_score,
+                    "severity": row.severity
+                }
+            })
+
+        return {
+            "type": "FeatureCollection",
+            "stat_date": str(target_date),
+            "features": features
+        }
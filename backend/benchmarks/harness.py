@@ -0,0 +1,272 @@
+"""
+Times API endpoints and service methods against a database filled by
+'synthetic.py' and writes the results as JSON, so two runs can be compared.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from benchmarks.synthetic import BLOCK_METERS, METERS_PER_DEG_LAT, METERS_PER_DEG_LON, ORIGIN_LAT, ORIGIN_LON
+
+# Endpoints that are deliberately not timed: they queue jobs for the scheduler
+SKIPPED_ROUTES = {
+    ("POST", "/api/jobs/{job_name}"),
+    ("POST", "/api/jobs/{job_id}/resume"),
+}
+
+# Benchmarks that change what they measure when repeated (the second run of
+# update_for_date skips the day it already applied, the first routing query
+# builds the graph), so they are timed once
+ONE_SHOT = {
+    "TrendService.update_for_date",
+    "RoutingService.check_passability (cold)",
+}
+
+# Passability query across 20 x 20 blocks of the synthetic grid
+ROUTE = {
+    "from_lat": ORIGIN_LAT,
+    "from_lon": ORIGIN_LON,
+    "to_lat": ORIGIN_LAT + 20 * BLOCK_METERS / METERS_PER_DEG_LAT,
+    "to_lon": ORIGIN_LON + 20 * BLOCK_METERS / METERS_PER_DEG_LON,
+    "vehicle_width": 300.0,
+}
+
+
+def measure(func, repeat: int, warmup: int = 1):
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+
+    ordered = sorted(samples)
+    return {
+        "runs": repeat,
+        "min": round(ordered[0], 6),
+        "median": round(statistics.median(ordered), 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 6),
+        "mean": round(statistics.fmean(ordered), 6),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def service_cases(db, target_date, segment_id):
+    from app.services.analytics_service import AnalyticsService
+    from app.services.dashboard_service import DashboardService
+    from app.services.ml_service import MLService
+    from app.services.trend_service import TrendService
+    from app.services.routing_service import PassabilityGraph, RoutingService
+
+    analytics = AnalyticsService(db)
+    dashboard = DashboardService(db)
+    ml = MLService(db)
+    trends = TrendService(db)
+    routing = RoutingService(db)
+    route = ROUTE
+
+    return {
+        "AnalyticsService.calculate_daily_stats": lambda: analytics.calculate_daily_stats(target_date),
+        "TrendService.update_for_date": lambda: trends.update_for_date(target_date),
+        "AnalyticsService.get_segment_histogram": lambda: analytics.get_segment_histogram(segment_id),
+        "DashboardService.get_coverage_map_data": dashboard.get_coverage_map_data,
+        "DashboardService.get_activity_chart_data": dashboard.get_activity_chart_data,
+        "DashboardService.get_quality_pie_data": dashboard.get_quality_pie_data,
+        "DashboardService.get_critical_segments": dashboard.get_critical_segments,
+        "DashboardService.get_global_stats": dashboard.get_global_stats,
+        "MLService.detect_obstacles": lambda: ml.detect_obstacles(target_date),
+        # Also makes the obstacles endpoint below serve the stored clusters
+        "MLService.store_obstacles": lambda: ml.store_obstacles(target_date),
+        "TrendService.get_changes": lambda: trends.get_changes(target_date),
+        # A fresh graph holder: includes building the graph, as in a new worker
+        "RoutingService.check_passability (cold)": lambda: RoutingService(
+            db, passability_graph=PassabilityGraph()
+        ).check_passability(**route),
+        "RoutingService.check_passability": lambda: routing.check_passability(**route),
+    }
+
+
+def prepare_history(db, days):
+    """
+    Fills statistics and rebuilds the width baselines for every day before the
+    benchmark day, so that update_for_date and the changes endpoint work on a
+    realistic history. Statistics already present are kept.
+    """
+    from sqlalchemy import select
+
+    from app.models import SegmentStatistics
+    from app.services.analytics_service import AnalyticsService
+    from app.services.trend_service import MIN_OBSERVATIONS, TrendService
+
+    if len(days) <= MIN_OBSERVATIONS:
+        print(
+            f"Warning: {len(days)} day(s) generated; width changes need at least "
+            f"{MIN_OBSERVATIONS + 1} (generate with --days {MIN_OBSERVATIONS + 2})"
+        )
+
+    analytics = AnalyticsService(db)
+    trends = TrendService(db)
+    trends.reset()
+    for day in days[:-1]:
+        has_stats = db.scalar(select(SegmentStatistics.id).where(SegmentStatistics.stat_date == day).limit(1))
+        if has_stats is None:
+            analytics.calculate_daily_stats(day)
+        trends.update_for_date(day)
+
+
+def endpoint_cases(app, target_date, segment_id, job_id):
+    """
+    Returns {"METHOD /path": (method, url)} for every route of the app. Raises
+    if a route has no case, so new endpoints cannot silently go unbenchmarked.
+    """
+    urls = {
+        ("GET", "/"): "/",
+        ("GET", "/metrics"): "/metrics",
+        ("GET", "/api/status"): "/api/status",
+        ("GET", "/api/map/segments"): f"/api/map/segments?target_date={target_date}",
+        ("GET", "/api/stats/segment/{segment_id}/histogram"): f"/api/stats/segment/{segment_id}/histogram",
+        ("GET", "/api/roads/search"): "/api/roads/search?q=Synthetic%20Street%201",
+        ("GET", "/api/dashboard/stats"): "/api/dashboard/stats",
+        ("GET", "/api/dashboard/coverage"): "/api/dashboard/coverage",
+        ("GET", "/api/analytics/obstacles"): f"/api/analytics/obstacles?target_date={target_date}",
+        ("GET", "/api/analytics/changes"): f"/api/analytics/changes?target_date={target_date}",
+        ("GET", "/api/routing/passable"): "/api/routing/passable?" + urlencode(ROUTE),
+        ("GET", "/api/jobs"): "/api/jobs",
+        ("GET", "/api/jobs/{job_id}"): f"/api/jobs/{job_id}",
+    }
+
+    cases = {}
+    missing = []
+    for route in app.routes:
+        methods = getattr(route, "methods", None) or set()
+        if not getattr(route, "include_in_schema", True) and route.path != "/metrics":
+            continue
+        for method in sorted(methods - {"HEAD", "OPTIONS"}):
+            key = (method, route.path)
+            if key in SKIPPED_ROUTES:
+                continue
+            if key not in urls:
+                missing.append(f"{method} {route.path}")
+                continue
+            cases[f"{method} {route.path}"] = (method, urls[key])
+
+    if missing:
+        raise RuntimeError(f"No benchmark case for: {', '.join(missing)}")
+    return cases
+
+
+def run_benchmarks(days, repeat: int = 5, only: str = None):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from app.database import SessionLocal
+    from app.jobs import JobRunner
+    from app.main import app
+    from app.models import CleanedMeasurement, RoadSegment
+    from app.schema import init_schema
+
+    init_schema()
+    target_date = days[-1]
+    db = SessionLocal()
+    try:
+        segment_id = str(db.scalar(select(RoadSegment.id).order_by(RoadSegment.osm_id).limit(1)))
+        scale = {
+            "segments": db.scalar(select(func.count(RoadSegment.id))),
+            "measurements": db.scalar(select(func.count(CleanedMeasurement.id))),
+        }
+
+        runner = JobRunner()
+        job_id = runner.submit("daily_stats", {"date": target_date.isoformat()}, trigger="bench")["id"]
+
+        print(f"Preparing statistics and baselines for {len(days) - 1} earlier day(s)...")
+        prepare_history(db, days)
+
+        results = {}
+
+        # Services first: calculate_daily_stats fills segment_statistics for the
+        # map and dashboard endpoints below, update_for_date the changes.
+        for name, func_ in service_cases(db, target_date, segment_id).items():
+            if only and only not in name:
+                continue
+            print(f"Timing {name}...")
+            if name in ONE_SHOT:
+                results[name] = measure(func_, 1, warmup=0)
+            else:
+                results[name] = measure(func_, repeat)
+            db.rollback()
+
+        client = TestClient(app)
+        for name, (method, url) in endpoint_cases(app, target_date, segment_id, job_id).items():
+            if only and only not in name:
+                continue
+            print(f"Timing {name}...")
+
+            def call():
+                response = client.request(method, url)
+                response.raise_for_status()
+
+            results[name] = measure(call, repeat)
+    finally:
+        db.close()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "target_date": target_date.isoformat(),
+            "days": len(days),
+            "repeat": repeat,
+            **scale,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2):
+    """
+    Compares median timings. Returns a list of (name, baseline, current, ratio)
+    for every benchmark that got slower than 'tolerance' allows.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<55} new      {result['median'] * 1000:10.1f} ms")
+            continue
+
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(
+            f"{name:<55} {before['median'] * 1000:10.1f} ms -> "
+            f"{result['median'] * 1000:10.1f} ms  x{ratio:5.2f} {flag}"
+        )
+        if flag:
+            regressions.append((name, before["median"], result["median"], ratio))
+
+    for key in ("segments", "measurements"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Warning: {key} differ ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+
+    return regressions
+
+
+def write_results(results: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
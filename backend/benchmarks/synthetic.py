@@ -0,0 +1,203 @@
+"""
+Synthetic data generators for benchmarks.
+
+The road network is a regular grid of streets around Plzeň; fleet traces are
+measurements scattered along random segments with per-segment base widths and
+a few injected narrow clusters so that obstacle detection has work to do. On
+the last day a small share of segments is narrower than usual, so width
+change detection has drops to find.
+Everything is driven by a seed, so the same arguments always produce the same
+data. Rows are produced in batches and streamed into PostgreSQL with COPY, so
+memory use does not grow with the number of points.
+"""
+import io
+import math
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+ORIGIN_LAT = 49.7384
+ORIGIN_LON = 13.3736
+BLOCK_METERS = 100.0
+METERS_PER_DEG_LAT = 111_320.0
+METERS_PER_DEG_LON = METERS_PER_DEG_LAT * math.cos(math.radians(ORIGIN_LAT))
+
+# Widths are stored in centimetres, like the real fleet data
+MIN_BASE_WIDTH = 250.0
+MAX_BASE_WIDTH = 700.0
+WIDTH_NOISE = 20.0
+LATERAL_NOISE_METERS = 2.0
+
+# Share of points placed in narrow clusters (parked cars, construction)
+OBSTACLE_SHARE = 0.01
+OBSTACLE_WIDTH = 220.0
+
+# Share of segments narrowed on the last day, and by how much (cm)
+DROP_SHARE = 0.02
+DROP_WIDTH = 150.0
+
+
+class SyntheticCity:
+    """
+    A grid road network with approximately 'segment_count' segments.
+    Horizontal and vertical streets alternate so the graph is connected.
+    """
+
+    def __init__(self, segment_count: int, seed: int = 42):
+        self.seed = seed
+        # A k x k grid of intersections has 2k(k-1) edges
+        self.side = max(2, math.ceil((1 + math.sqrt(1 + 2 * segment_count)) / 2))
+
+        rng = np.random.default_rng(seed)
+        k = self.side
+        horizontal = [((r, c), (r, c + 1)) for r in range(k) for c in range(k - 1)]
+        vertical = [((r, c), (r + 1, c)) for c in range(k) for r in range(k - 1)]
+        edges = (horizontal + vertical)[:segment_count]
+
+        self.starts = np.array([e[0] for e in edges], dtype=np.float64)
+        self.ends = np.array([e[1] for e in edges], dtype=np.float64)
+        self.base_widths = rng.uniform(MIN_BASE_WIDTH, MAX_BASE_WIDTH, len(edges))
+        self.ids = [uuid.UUID(bytes=rng.bytes(16), version=4) for _ in edges]
+        self.is_horizontal = np.array([e[0][0] == e[1][0] for e in edges])
+
+        # Separate random stream, so the other data does not depend on the drops
+        self.dropped = np.random.default_rng(seed + 2).random(len(edges)) < DROP_SHARE
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def to_lonlat(grid_rows, grid_cols):
+        lat = ORIGIN_LAT + grid_rows * BLOCK_METERS / METERS_PER_DEG_LAT
+        lon = ORIGIN_LON + grid_cols * BLOCK_METERS / METERS_PER_DEG_LON
+        return lon, lat
+
+    def segment_rows(self):
+        """Yields (id, osm_id, name, road_type, ewkt) tuples."""
+        lon1, lat1 = self.to_lonlat(self.starts[:, 0], self.starts[:, 1])
+        lon2, lat2 = self.to_lonlat(self.ends[:, 0], self.ends[:, 1])
+        for i, segment_id in enumerate(self.ids):
+            if self.is_horizontal[i]:
+                name = f"Synthetic Street {int(self.starts[i, 0])}"
+            else:
+                name = f"Synthetic Avenue {int(self.starts[i, 1])}"
+            yield (
+                str(segment_id),
+                f"bench-{i}",
+                name,
+                "residential",
+                f"SRID=4326;LINESTRING({lon1[i]:.7f} {lat1[i]:.7f}, {lon2[i]:.7f} {lat2[i]:.7f})",
+            )
+
+    def measurement_batches(self, point_count: int, days: list, batch_size: int = 500_000):
+        """
+        Yields lists of (width, quality, ewkt, created_at) tuples, 'point_count'
+        in total, spread evenly over 'days'. Segments in 'dropped' are
+        DROP_WIDTH narrower on the last day.
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        segment_count = len(self)
+
+        # A handful of obstacle hotspots reused every day
+        hotspot_count = max(1, segment_count // 200)
+        hotspots = rng.integers(0, segment_count, hotspot_count)
+        hotspot_t = rng.uniform(0.2, 0.8, hotspot_count)
+
+        remaining = point_count
+        day_index = 0
+        per_day = math.ceil(point_count / len(days))
+        produced_today = 0
+
+        while remaining > 0:
+            size = min(batch_size, remaining, per_day - produced_today)
+            day = days[day_index]
+
+            segments = rng.integers(0, segment_count, size)
+            t = rng.uniform(0.0, 1.0, size)
+            widths = self.base_widths[segments] + rng.normal(0.0, WIDTH_NOISE, size)
+            if day_index == len(days) - 1 and len(days) > 1:
+                widths -= DROP_WIDTH * self.dropped[segments]
+
+            obstacle_mask = rng.random(size) < OBSTACLE_SHARE
+            obstacle_count = int(obstacle_mask.sum())
+            if obstacle_count:
+                picked = rng.integers(0, hotspot_count, obstacle_count)
+                segments[obstacle_mask] = hotspots[picked]
+                t[obstacle_mask] = hotspot_t[picked] + rng.normal(0.0, 0.01, obstacle_count)
+                widths[obstacle_mask] = OBSTACLE_WIDTH + rng.normal(0.0, 10.0, obstacle_count)
+
+            rows = self.starts[segments] + (self.ends[segments] - self.starts[segments]) * t[:, None]
+            rows += rng.normal(0.0, LATERAL_NOISE_METERS / BLOCK_METERS, rows.shape)
+            lon, lat = self.to_lonlat(rows[:, 0], rows[:, 1])
+
+            quality = rng.uniform(0.5, 1.0, size)
+            day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            seconds = np.sort(rng.integers(0, 86_400, size))
+
+            yield [
+                (
+                    f"{widths[i]:.1f}",
+                    f"{quality[i]:.2f}",
+                    f"SRID=4326;POINT({lon[i]:.7f} {lat[i]:.7f})",
+                    (day_start + timedelta(seconds=int(seconds[i]))).isoformat(),
+                )
+                for i in range(size)
+            ]
+
+            remaining -= size
+            produced_today += size
+            if produced_today >= per_day:
+                day_index = min(day_index + 1, len(days) - 1)
+                produced_today = 0
+
+
+def benchmark_days(day_count: int, last_day: date = date(2025, 12, 23)):
+    return [last_day - timedelta(days=i) for i in reversed(range(day_count))]
+
+
+def _copy_rows(cursor, table: str, columns: list, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)", buffer
+    )
+
+
+def load_city(engine, city: SyntheticCity, point_count: int, days: list, batch_size: int = 500_000):
+    """Streams the city and its measurements into the database with COPY."""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+
+        print(f"Loading {len(city)} road segments...")
+        segments = list(city.segment_rows())
+        for offset in range(0, len(segments), batch_size):
+            _copy_rows(
+                cursor,
+                "road_segments",
+                ["id", "osm_id", "name", "road_type", "geom"],
+                segments[offset:offset + batch_size],
+            )
+        connection.commit()
+
+        loaded = 0
+        for batch in city.measurement_batches(point_count, days, batch_size):
+            _copy_rows(
+                cursor,
+                "cleaned_measurements",
+                ["cleaned_width", "quality_score", "geom", "created_at"],
+                batch,
+            )
+            connection.commit()
+            loaded += len(batch)
+            print(f"Loaded {loaded}/{point_count} measurements.")
+
+        cursor.execute("ANALYZE road_segments")
+        cursor.execute("ANALYZE cleaned_measurements")
+        connection.commit()
+    finally:
+        connection.close()
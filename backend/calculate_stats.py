@@ -1,25 +1,47 @@
-from datetime import date
-from app.database import SessionLocal
-from app.services.analytics_service import AnalyticsService
-import traceback
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+from app.jobs import JobRunner
+from app.schema import init_schema
 
 
 def main():
-    # today = date.today()
-    today = date(2025, 12, 23)
+    parser = argparse.ArgumentParser(description="Calculate daily segment statistics")
+    parser.add_argument(
+        "--date",
+        type=date.fromisoformat,
+        default=date.today() - timedelta(days=1),
+        help="Day to calculate (default: yesterday), or first day of a backfill",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=date.fromisoformat,
+        help="Last day of a backfill (inclusive)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-    print(f"Starting statistics calculation for {today}...")
+    start_date = args.date
+    end_date = args.end_date or start_date
 
-    db = SessionLocal()
-    try:
-        service = AnalyticsService(db)
-        service.calculate_daily_stats(today)
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        traceback.print_exc()
-    finally:
-        db.close()
+    print(f"Starting statistics calculation for {start_date} - {end_date}...")
+
+    init_schema()
+    runner = JobRunner()
+    job = runner.start(
+        "daily_stats",
+        {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+    )
+
+    if job["status"] != "succeeded":
+        print(f"An error occurred:\n{job['error']}")
+        print(f"Resume with: python run_job.py resume {job['id']}")
+        return 1
+
+    print(f"Finished in stages: {job['stage_timings']}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
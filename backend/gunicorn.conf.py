@@ -0,0 +1,49 @@
+# Production server configuration: gunicorn managing uvicorn workers.
+#     gunicorn -c gunicorn.conf.py app.main:app
+import os
+import shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Async workers serve many requests each, so one per usable CPU is enough;
+# 2 x CPU + 1 is meant for sync workers. cpu_count() reports the host's CPUs
+# inside a container, so use the CPUs this process may run on, capped to
+# keep the database connection count in check: every worker has its own
+# pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections (see app/database.py).
+_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+workers = int(os.getenv("WEB_CONCURRENCY", min(_cpus, 4)))
+
+# Import the app once in the master and fork workers from it, so module
+# imports are paid once instead of once per worker
+preload_app = True
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap memory growth from batch endpoints
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+accesslog = "-"
+
+# Each worker writes its metrics to this directory and /metrics aggregates them.
+# Reset it here, before the app (and its metrics) are preloaded, so values from
+# a previous run are not reported again.
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir:
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes; drop any inherited from the master
+    from app.database import engine
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
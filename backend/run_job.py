@@ -0,0 +1,93 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from app.jobs import JOBS, JobClaimError, JobRunner, NightlyScheduler
+from app.metrics import start_metrics_server
+from app.schema import init_schema
+
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"Invalid --param '{pair}', expected key=value")
+        params[key] = value
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClearWay Analytics job runner")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("jobs", help="List available job types")
+
+    commands.add_parser("init-db", help="Create the tables and indexes owned by this backend")
+
+    run_parser = commands.add_parser("run", help="Run a job in this process")
+    run_parser.add_argument("name", choices=sorted(JOBS))
+    run_parser.add_argument("--param", action="append", metavar="KEY=VALUE")
+
+    resume_parser = commands.add_parser("resume", help="Resume a failed or interrupted job")
+    resume_parser.add_argument("job_id")
+
+    status_parser = commands.add_parser("status", help="Show one job or the most recent jobs")
+    status_parser.add_argument("job_id", nargs="?")
+
+    scheduler_parser = commands.add_parser("scheduler", help="Run nightly and queued jobs")
+    scheduler_parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("SCHEDULER_METRICS_PORT", "9100")),
+        help="Port for Prometheus metrics of the jobs (0 disables it)",
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.command == "jobs":
+        for definition in JOBS.values():
+            print(f"{definition.name:<12} {definition.description}")
+        return 0
+
+    if args.command == "init-db":
+        init_schema()
+        print("Schema is up to date.")
+        return 0
+
+    runner = JobRunner()
+
+    if args.command == "scheduler":
+        init_schema()
+        # Jobs run here, so their stage, DBSCAN and duration metrics are scraped here
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port)
+        NightlyScheduler(runner).run_forever()
+        return 0
+
+    if args.command == "status":
+        output = runner.get(args.job_id) if args.job_id else runner.list_jobs()
+        print(json.dumps(output, indent=2, default=str))
+        return 0
+
+    if args.command == "run":
+        job = runner.start(args.name, parse_params(args.param), trigger="cli")
+    else:
+        try:
+            job = runner.run(args.job_id)
+        except JobClaimError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+    print(json.dumps(job, indent=2, default=str))
+    if job["status"] != "succeeded":
+        print(f"Job failed. Resume with: python run_job.py resume {job['id']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
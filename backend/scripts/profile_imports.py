@@ -0,0 +1,67 @@
+"""
+Reports how long it takes to import the API (what every worker pays on cold
+start) and checks that batch-only dependencies stay off the serving path.
+
+Usage (from the backend directory):
+    python scripts/profile_imports.py [--module app.main] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Heavy libraries that must only be imported on first use by batch code
+BATCH_ONLY_MODULES = ("geopandas", "sklearn", "osmnx", "scipy", "networkx")
+
+
+def profile(module: str):
+    """Returns {module_name: (self_us, cumulative_us)} from 'python -X importtime'."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        print(completed.stderr, file=sys.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = profile(args.module)
+    total_us = timings[args.module][1]
+
+    print(f"Import of {args.module}: {total_us / 1000:.0f} ms ({len(timings)} modules)\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    top = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in top:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    leaked = sorted(
+        name for name in timings
+        if name.split(".")[0] in BATCH_ONLY_MODULES and "." not in name
+    )
+    if leaked:
+        print(f"\nBatch-only modules imported on the serving path: {', '.join(leaked)}")
+        return 1
+
+    print("\nNo batch-only modules imported on the serving path.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,23 @@
-from app.database import SessionLocal
-from app.services.osm_service import OSMService
+import logging
+import sys
+from app.jobs import JobRunner
+from app.schema import init_schema
 
 def main():
     print("Seeding roads...")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
-    db = SessionLocal()
+    init_schema()
+    runner = JobRunner()
+    job = runner.start("osm_import", {"place": "Plzeň, Czechia"})
 
-    try:
-        service = OSMService(db)
-        service.import_segments_for_place("Plzeň, Czechia")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        db.close()
+    if job["status"] != "succeeded":
+        print(f"An error occurred:\n{job['error']}")
+        print(f"Resume with: python run_job.py resume {job['id']}")
+        return 1
+
+    print(f"Imported {job['result']['edges']} edges.")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
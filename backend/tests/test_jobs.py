@@ -0,0 +1,178 @@
+import time
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.jobs import registry
+from app.jobs.registry import JOBS, _edges_chunk_key, prepare_params
+from app.jobs.runner import RUNNING, SUCCEEDED, JobClaimError, JobContext, JobRunner
+from app.models import Job, JobCheckpoint
+from app.services.analytics_service import AnalyticsService
+from app.services.trend_service import TrendService
+
+
+class StateSession:
+    """Bookkeeping session of a JobContext: knows existing checkpoints, records new ones."""
+
+    def __init__(self, done=()):
+        self.done = list(done)
+        self.added = []
+        self.commits = 0
+
+    def scalars(self, statement):
+        return SimpleNamespace(all=lambda: list(self.done))
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        self.commits += 1
+
+
+def make_context(params=None, done=(), stage_timings=None):
+    job = Job(id=uuid.uuid4(), name="daily_stats", params=params or {}, stage_timings=stage_timings or {})
+    state_db = StateSession(done)
+    return JobContext(job, state_db, work_db=object()), state_db
+
+
+def test_chunk_records_checkpoint():
+    ctx, state_db = make_context(done=["2025-12-22"])
+    ctx.set_total(2)
+
+    assert ctx.is_done("2025-12-22")
+    assert not ctx.is_done("2025-12-23")
+
+    with ctx.chunk("2025-12-23"):
+        pass
+
+    assert ctx.is_done("2025-12-23")
+    assert [(c.chunk_key, c.job_id) for c in state_db.added] == [("2025-12-23", ctx.job.id)]
+    assert isinstance(state_db.added[0], JobCheckpoint)
+    assert ctx.job.chunks_done == 2
+
+
+def test_failed_chunk_writes_no_checkpoint():
+    ctx, state_db = make_context()
+    ctx.set_total(1)
+
+    with pytest.raises(RuntimeError):
+        with ctx.chunk("2025-12-23"):
+            raise RuntimeError("boom")
+
+    assert not ctx.is_done("2025-12-23")
+    assert state_db.added == []
+    assert ctx.job.chunks_done == 0
+
+
+def test_stage_timings_accumulate_across_attempts():
+    # 'load' already took 1.5 s in an earlier attempt
+    ctx, _ = make_context(stage_timings={"load": 1.5})
+
+    with ctx.stage("load"):
+        time.sleep(0.01)
+    with pytest.raises(ValueError):
+        with ctx.stage("write"):
+            raise ValueError("interrupted")
+
+    assert ctx.job.stage_timings["load"] > 1.5
+    # A stage interrupted by an error is still accounted for
+    assert "write" in ctx.job.stage_timings
+
+
+@pytest.fixture
+def processed_days(monkeypatch):
+    days = []
+    monkeypatch.setattr(AnalyticsService, "calculate_daily_stats", lambda self, day: days.append(day))
+    monkeypatch.setattr(TrendService, "update_for_date", lambda self, day: None)
+    return days
+
+
+def test_daily_stats_processes_range_and_skips_checkpointed_days(processed_days):
+    ctx, _ = make_context(
+        {"start_date": "2025-12-20", "end_date": "2025-12-23"}, done=["2025-12-21"]
+    )
+
+    result = JOBS["daily_stats"].func(ctx)
+
+    assert processed_days == [date(2025, 12, 20), date(2025, 12, 22), date(2025, 12, 23)]
+    assert result == {"start_date": "2025-12-20", "end_date": "2025-12-23", "days": 4}
+    assert ctx.job.chunks_total == 4
+    assert ctx.job.chunks_done == 4
+
+
+def test_daily_stats_single_date(processed_days):
+    ctx, _ = make_context({"date": "2025-12-23"})
+    JOBS["daily_stats"].func(ctx)
+    assert processed_days == [date(2025, 12, 23)]
+
+
+def test_daily_stats_rejects_reversed_range(processed_days):
+    ctx, _ = make_context({"start_date": "2025-12-23", "end_date": "2025-12-20"})
+    with pytest.raises(ValueError):
+        JOBS["daily_stats"].func(ctx)
+    assert processed_days == []
+
+
+def test_default_date_is_fixed_at_submit(monkeypatch):
+    params = prepare_params("daily_stats", {})
+    assert params == {"date": (date.today() - timedelta(days=1)).isoformat()}
+
+    # A retry on a later day still works on the stored date
+    monkeypatch.setattr(registry, "_yesterday", lambda: date(2030, 1, 1))
+    assert prepare_params("daily_stats", params) == params
+    assert prepare_params("daily_stats", {"start_date": "2025-12-01"}) == {"start_date": "2025-12-01"}
+    assert prepare_params("osm_import", {"place": "Plzeň"}) == {"place": "Plzeň"}
+
+
+def test_edges_chunk_key_depends_on_content():
+    key = _edges_chunk_key(["1-2-0", "1-3-0", "2-4-0"])
+    assert key.startswith("edges:1-2-0..2-4-0:")
+    assert _edges_chunk_key(["1-2-0", "1-3-0", "2-4-0"]) == key
+    # Same bounds, an edge added in between
+    assert _edges_chunk_key(["1-2-0", "1-3-0", "1-4-0", "2-4-0"]) != key
+
+
+class RunnerSession:
+    """Session for JobRunner: 'get' returns a fixed job, conditional updates match nothing."""
+
+    def __init__(self, job):
+        self.job = job
+
+    def get(self, model, job_id):
+        return self.job
+
+    def scalar(self, statement):
+        return None
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("status", [RUNNING, SUCCEEDED])
+def test_requeue_refuses_running_or_succeeded_jobs(status):
+    job = Job(id=uuid.uuid4(), name="daily_stats", params={}, status=status, stage_timings={})
+    runner = JobRunner(session_factory=lambda: RunnerSession(job))
+
+    with pytest.raises(JobClaimError):
+        runner.requeue(job.id)
+
+
+def test_run_refuses_a_job_claimed_elsewhere():
+    job = Job(id=uuid.uuid4(), name="daily_stats", params={}, status=RUNNING, stage_timings={})
+    runner = JobRunner(session_factory=lambda: RunnerSession(job))
+
+    with pytest.raises(JobClaimError):
+        runner.run(job.id)
+
+
+def test_run_returns_succeeded_job_without_claiming():
+    job = Job(id=uuid.uuid4(), name="daily_stats", params={}, status=SUCCEEDED, stage_timings={})
+    runner = JobRunner(session_factory=lambda: RunnerSession(job))
+
+    assert runner.run(job.id)["status"] == SUCCEEDED
+
@@ -0,0 +1,234 @@
+import heapq
+import math
+import random
+import uuid
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.routing_service import (
+    EARTH_RADIUS_METERS, RoadGraph, RoutingGraphUnavailable, RoutingService, _is_blocked, find_route,
+)
+from benchmarks.synthetic import SyntheticCity
+
+
+def equirectangular_lengths(starts, ends):
+    lat = np.radians((starts[:, 1] + ends[:, 1]) / 2)
+    dx = np.radians(ends[:, 0] - starts[:, 0]) * np.cos(lat)
+    dy = np.radians(ends[:, 1] - starts[:, 1])
+    return np.hypot(dx, dy) * EARTH_RADIUS_METERS
+
+
+def make_graph(points, segments):
+    """Graph from {name: (lon, lat)} and [(from, to)]; segment ids are their list index."""
+    starts = np.array([points[a] for a, _ in segments], dtype=np.float64)
+    ends = np.array([points[b] for _, b in segments], dtype=np.float64)
+    return RoadGraph(list(range(len(segments))), starts, ends, equirectangular_lengths(starts, ends))
+
+
+def node_of(graph, point):
+    lon, lat = point
+    return graph.nearest_node(lat, lon)[0]
+
+
+def dijkstra(graph, source, target, vehicle_width=None, width_metric="min", allow_unmeasured=True):
+    widths = graph.widths(width_metric)
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if node == target:
+            return distance
+        if distance > best[node]:
+            continue
+        for arc in range(graph.indptr[node], graph.indptr[node + 1]):
+            edge = graph.arc_edge[arc]
+            if vehicle_width is not None and _is_blocked(widths[edge], vehicle_width, allow_unmeasured):
+                continue
+            neighbour = graph.indices[arc]
+            candidate = distance + graph.length[edge]
+            if candidate < best.get(neighbour, math.inf):
+                best[neighbour] = candidate
+                heapq.heappush(heap, (candidate, neighbour))
+    return None
+
+
+@pytest.fixture(scope="module")
+def city_graph():
+    city = SyntheticCity(10_000, seed=7)
+    lon1, lat1 = city.to_lonlat(city.starts[:, 0], city.starts[:, 1])
+    lon2, lat2 = city.to_lonlat(city.ends[:, 0], city.ends[:, 1])
+    starts = np.column_stack([lon1, lat1])
+    ends = np.column_stack([lon2, lat2])
+    graph = RoadGraph(city.ids, starts, ends, equirectangular_lengths(starts, ends))
+
+    rng = random.Random(7)
+    for segment_id, base in zip(city.ids, city.base_widths):
+        if rng.random() < 0.1:
+            continue  # never measured
+        graph.set_statistics(segment_id, date(2025, 12, 23), base - 40.0, base)
+    return graph
+
+
+def test_astar_matches_dijkstra(city_graph):
+    rng = random.Random(42)
+    for i in range(200):
+        source = rng.randrange(city_graph.node_count)
+        target = rng.randrange(city_graph.node_count)
+        options = {}
+        if i % 2:
+            options = {
+                "vehicle_width": rng.choice([250.0, 350.0, 450.0]),
+                "width_metric": rng.choice(["min", "avg"]),
+                "allow_unmeasured": rng.random() < 0.5,
+            }
+
+        found = city_graph.shortest_path(source, target, **options)
+        expected = dijkstra(city_graph, source, target, **options)
+
+        if expected is None:
+            assert found is None
+            continue
+        distance, path = found
+        assert distance == pytest.approx(expected)
+        assert sum(city_graph.length[edge] for edge in path) == pytest.approx(distance)
+
+
+# A square: the short way A-B-D, the long way A-C-E-D
+POINTS = {
+    "A": (13.000, 49.000),
+    "B": (13.001, 49.000),
+    "C": (13.000, 49.001),
+    "E": (13.002, 49.001),
+    "D": (13.002, 49.000),
+}
+SEGMENTS = [("A", "B"), ("B", "D"), ("A", "C"), ("C", "E"), ("E", "D")]
+
+
+@pytest.fixture
+def square():
+    graph = make_graph(POINTS, SEGMENTS)
+    day = date(2025, 12, 23)
+    graph.set_statistics(0, day, 600.0, 650.0)
+    graph.set_statistics(1, day, 250.0, 350.0)  # narrow at one spot
+    for segment in (2, 3, 4):
+        graph.set_statistics(segment, day, 500.0, 520.0)
+    return graph, node_of(graph, POINTS["A"]), node_of(graph, POINTS["D"])
+
+
+def test_width_filter_takes_detour(square):
+    graph, a, d = square
+
+    _, short = graph.shortest_path(a, d)
+    assert short == [0, 1]
+    assert graph.shortest_path(a, d, vehicle_width=240.0)[1] == [0, 1]
+    assert graph.shortest_path(a, d, vehicle_width=300.0)[1] == [2, 3, 4]
+
+
+def test_width_metric(square):
+    graph, a, d = square
+
+    assert graph.shortest_path(a, d, vehicle_width=300.0, width_metric="avg")[1] == [0, 1]
+    assert graph.shortest_path(a, d, vehicle_width=300.0, width_metric="min")[1] == [2, 3, 4]
+
+
+def test_unmeasured_segments():
+    graph = make_graph(POINTS, SEGMENTS)  # nothing measured
+    a, d = node_of(graph, POINTS["A"]), node_of(graph, POINTS["D"])
+
+    assert graph.shortest_path(a, d, vehicle_width=300.0)[1] == [0, 1]
+    assert graph.shortest_path(a, d, vehicle_width=300.0, allow_unmeasured=False) is None
+
+
+def test_find_route_reports_blocking_segments(square):
+    graph, a, d = square
+
+    outcome, distance, edges = find_route(graph, a, d, vehicle_width=300.0)
+    assert outcome == "passable"
+    assert edges == [2, 3, 4]
+    assert distance == pytest.approx(sum(graph.length[edge] for edge in edges))
+
+    outcome, distance, edges = find_route(graph, a, d, vehicle_width=510.0)
+    assert outcome == "blocked"
+    assert distance is None
+    # Only the too-narrow segments of the unrestricted shortest route
+    assert edges == [1]
+
+    outcome, _, edges = find_route(graph, a, d, vehicle_width=300.0, width_metric="avg")
+    assert (outcome, edges) == ("passable", [0, 1])
+
+
+def test_find_route_without_connection():
+    points = dict(POINTS, F=(13.010, 49.010), G=(13.011, 49.010))
+    graph = make_graph(points, SEGMENTS + [("F", "G")])
+
+    outcome, distance, edges = find_route(graph, node_of(graph, points["A"]), node_of(graph, points["G"]), 200.0)
+    assert (outcome, distance, edges) == ("no_route", None, [])
+
+
+def test_set_statistics_reports_width_changes_only():
+    graph = make_graph(POINTS, SEGMENTS)
+    day, next_day = date(2025, 12, 22), date(2025, 12, 23)
+
+    assert graph.set_statistics(0, day, 400.0, 450.0)
+    # The same row read again
+    assert not graph.set_statistics(0, day, 400.0, 450.0)
+    # Older statistics never replace newer ones
+    assert not graph.set_statistics(0, date(2025, 12, 1), 100.0, 120.0)
+    assert graph.min_width[0] == 400.0
+    # A newer day with the same widths only moves the date
+    assert not graph.set_statistics(0, next_day, 400.0, 450.0)
+    assert graph.stat_day[0] == next_day.toordinal()
+    assert graph.set_statistics(0, next_day, 380.0, 450.0)
+
+    # Missing widths compare equal to each other
+    assert graph.set_statistics(1, day, None, None) is False
+    assert graph.set_statistics(1, day, None, 300.0)
+    assert not graph.set_statistics(1, day, None, 300.0)
+
+    # Unknown segments are ignored
+    assert not graph.set_statistics(uuid.uuid4(), day, 100.0, 100.0)
+
+
+class FixedGraph:
+    """Stands in for PassabilityGraph without a database."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def current(self, db):
+        return self.graph
+
+
+def test_check_passability_rejects_invalid_input(square):
+    graph, _, _ = square
+    service = RoutingService(None, passability_graph=FixedGraph(graph))
+    lon, lat = POINTS["A"]
+    to_lon, to_lat = POINTS["D"]
+
+    for vehicle_width in (math.nan, math.inf, 0.0, -5.0):
+        with pytest.raises(ValueError):
+            service.check_passability(lat, lon, to_lat, to_lon, vehicle_width)
+    with pytest.raises(ValueError):
+        service.check_passability(math.nan, lon, to_lat, to_lon, 300.0)
+    # Far away from every intersection
+    with pytest.raises(ValueError):
+        service.check_passability(lat + 1.0, lon, to_lat, to_lon, 300.0)
+
+
+def test_nan_snap_distance_is_rejected(square, monkeypatch):
+    graph, _, _ = square
+    monkeypatch.setattr(graph, "nearest_node", lambda lat, lon: (0, math.nan))
+    service = RoutingService(None, passability_graph=FixedGraph(graph))
+
+    with pytest.raises(ValueError):
+        service.check_passability(49.0, 13.0, 49.0, 13.002, 300.0)
+
+
+def test_empty_graph_is_unavailable():
+    graph = RoadGraph([], np.empty((0, 2)), np.empty((0, 2)), [])
+    service = RoutingService(None, passability_graph=FixedGraph(graph))
+
+    with pytest.raises(RoutingGraphUnavailable):
+        service.check_passability(49.0, 13.0, 49.0, 13.002, 300.0)
@@ -0,0 +1,153 @@
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.trend_service import (
+    CRITICAL_WIDTH, EWMA_ALPHA, MIN_DROP, MIN_OBSERVATIONS, MIN_STD, Z_THRESHOLD,
+    TrendService, plan_updates, score_observation, update_baseline,
+)
+
+
+def baseline(mean, var=0.0, observations=MIN_OBSERVATIONS):
+    return SimpleNamespace(ewma_mean=mean, ewma_var=var, observations=observations)
+
+
+def fold(values):
+    state = None
+    for value in values:
+        mean, var, n = update_baseline(state, value)
+        state = baseline(mean, var, n)
+    return state
+
+
+def test_first_observation_starts_baseline():
+    assert update_baseline(None, 420.0) == (420.0, 0.0, 1)
+
+
+def test_update_matches_ewma_definition():
+    values = [500.0, 480.0, 530.0, 510.0, 470.0, 505.0]
+    state = fold(values)
+
+    mean, var = values[0], 0.0
+    for value in values[1:]:
+        diff = value - mean
+        mean = mean + EWMA_ALPHA * diff
+        var = (1 - EWMA_ALPHA) * (var + EWMA_ALPHA * diff * diff)
+
+    assert state.ewma_mean == pytest.approx(mean)
+    assert state.ewma_var == pytest.approx(var)
+    assert state.observations == len(values)
+
+
+def test_constant_series_has_no_variance():
+    state = fold([450.0] * 10)
+    assert state.ewma_mean == pytest.approx(450.0)
+    assert state.ewma_var == pytest.approx(0.0)
+
+
+def test_no_score_without_enough_history():
+    assert score_observation(None, 100.0) is None
+    assert score_observation(baseline(500.0, observations=MIN_OBSERVATIONS - 1), 100.0) is None
+
+
+def test_std_is_floored_for_stable_segments():
+    # Zero variance would make any dip infinitely significant
+    assert score_observation(baseline(500.0), 500.0 - (MIN_DROP - 1)) is None
+
+    z_score, _ = score_observation(baseline(500.0), 500.0 - 4 * MIN_STD)
+    assert z_score == pytest.approx(-4.0)
+
+
+def test_drop_within_noise_is_ignored():
+    noisy = baseline(500.0, var=40.0 ** 2)
+    assert score_observation(noisy, 500.0 - 2 * 40.0) is None
+
+
+def test_rise_is_ignored():
+    assert score_observation(baseline(500.0), 700.0) is None
+
+
+def test_warning_drop():
+    z_score, severity = score_observation(baseline(500.0, var=15.0 ** 2), 440.0)
+    assert z_score == pytest.approx(-4.0)
+    assert severity == "warning"
+
+
+def test_strong_drop_is_critical():
+    z_score, severity = score_observation(baseline(500.0, var=10.0 ** 2), 420.0)
+    assert z_score <= -2 * Z_THRESHOLD
+    assert severity == "critical"
+
+
+def test_drop_below_critical_width_is_critical():
+    z_score, severity = score_observation(baseline(CRITICAL_WIDTH + 40.0, var=10.0 ** 2), CRITICAL_WIDTH - 5.0)
+    assert z_score > -2 * Z_THRESHOLD
+    assert severity == "critical"
+
+
+def row(segment_id, avg_width, last_stat_date=None, ewma_mean=None, ewma_var=None, observations=None):
+    return SimpleNamespace(
+        segment_id=segment_id, avg_width=avg_width, last_stat_date=last_stat_date,
+        ewma_mean=ewma_mean, ewma_var=ewma_var, observations=observations,
+    )
+
+
+def test_plan_updates_uses_one_row_per_segment():
+    day = date(2025, 12, 23)
+    segment = uuid.uuid4()
+    other = uuid.uuid4()
+    rows = [
+        row(segment, 350.0, date(2025, 12, 22), 500.0, 10.0 ** 2, MIN_OBSERVATIONS),
+        row(segment, 505.0, date(2025, 12, 22), 500.0, 10.0 ** 2, MIN_OBSERVATIONS),  # duplicate
+        row(other, 400.0),
+    ]
+
+    baselines, changes = plan_updates(rows, day)
+
+    assert [b["segment_id"] for b in baselines] == [segment, other]
+    assert baselines[0]["observations"] == MIN_OBSERVATIONS + 1
+    assert baselines[1] == {
+        "segment_id": other, "last_stat_date": day, "ewma_mean": 400.0, "ewma_var": 0.0, "observations": 1,
+    }
+    assert [(c["segment_id"], c["observed_width"], c["severity"]) for c in changes] == [
+        (segment, 350.0, "critical"),
+    ]
+
+
+def test_plan_updates_skips_days_already_applied():
+    day = date(2025, 12, 23)
+    rows = [row(uuid.uuid4(), 100.0, day, 500.0, 0.0, MIN_OBSERVATIONS)]
+    assert plan_updates(rows, day) == ([], [])
+
+
+class RecordingSession:
+    """Returns canned rows for the select and records the upserts."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        return SimpleNamespace(all=lambda: self.rows)
+
+    def commit(self):
+        pass
+
+
+def test_update_for_date_reads_latest_row_per_segment():
+    segment = uuid.uuid4()
+    db = RecordingSession([row(segment, 400.0), row(segment, 410.0)])
+
+    result = TrendService(db).update_for_date(date(2025, 12, 23))
+
+    select_sql = str(db.statements[0][0].compile(dialect=postgresql.dialect()))
+    assert "DISTINCT ON (segment_statistics.segment_id)" in select_sql
+    assert "ORDER BY segment_statistics.segment_id, segment_statistics.created_at DESC" in select_sql
+
+    _, baselines = db.statements[1]
+    assert [b["segment_id"] for b in baselines] == [segment]
+    assert result == {"baselines_updated": 1, "changes_flagged": 0}